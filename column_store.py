@@ -0,0 +1,422 @@
+"""
+Memory-mapped columnar dataset format. Opening a column store only maps
+its files, so it takes the same (constant) time regardless of the size of
+the dataset, and all processes on a host that open the same store share
+one page-cached copy of the data. Filters and the event table are computed
+from the mapped columns. ColumnStore.issues() however builds an Issue
+object for every selected row, which takes time and (per-process) memory
+in proportion to the number of issues; only the titles, bodies and
+comments stay in the shared heap.
+
+On-disk layout
+--------------
+A column store is a directory next to the data file (<data file>.columns)
+containing:
+
+    manifest.json
+        {"version": 1,
+         "source": <fingerprint of the data file, see snapshot.fingerprint>,
+         "num_issues": <n>, "num_events": <m>, "num_strings": <k>,
+         "columns": {"<column>": "<numpy dtype>", ...}}
+
+    <column>.bin
+        Fixed-width column: the raw little-endian values of the column
+        (numpy.ndarray.tofile), opened with numpy.memmap.
+
+    strings.heap / strings.offsets
+        String heap: the UTF-8 encoded strings back to back, and int64
+        offsets with k+1 entries so that string i is
+        heap[offsets[i]:offsets[i+1]]. All string columns store int32
+        string ids into the heap, with -1 for missing values. Short strings
+        (users, labels, event types, ...) are stored once and share an id.
+
+Issue columns (n rows, in data file order):
+
+    issues.number      int64
+    issues.state       int8   0 = open, 1 = closed, -1 = missing
+    issues.created     int64  UTC seconds since the epoch (NO_TIMESTAMP if missing)
+    issues.updated     int64  as issues.created
+    issues.url, issues.creator, issues.title, issues.text, issues.timeline_url
+                       int32  string ids
+    issues.label_offsets, issues.assignee_offsets
+                       int64  n+1 offsets into the following columns
+    issues.labels, issues.assignees
+                       int32  string ids
+    issues.label_is_json, issues.assignee_is_json
+                       int8   1 if the entry is not a plain string (e.g. a full
+                              GitHub user object) and is stored JSON encoded
+
+Event columns (m rows, grouped by issue in data file order; the events of
+issue i are rows event_offsets[i]:event_offsets[i+1]):
+
+    issues.event_offsets  int64  n+1 offsets
+    events.issue          int32  row of the issue
+    events.timestamp      int64  as issues.created
+    events.event_type, events.author, events.label, events.comment
+                          int32  string ids
+"""
+
+import logging
+logger = logging.getLogger(__name__)
+
+import json
+import math
+import os
+import shutil
+from functools import partial
+from typing import AbstractSet, Dict, List, Optional
+
+import numpy as np
+
+import sidecar
+import snapshot
+from event_table import EventTable, NO_TIMESTAMP
+from issue_filter import IssueFilter
+from model import Issue, Event, State
+from symbols import EVENT_TYPES, USERS, LABELS, SymbolTable
+from text_heap import TextHeap, TextRef
+
+COLUMN_STORE_SUFFIX:str = '.columns'
+FORMAT_VERSION:int = 1
+
+# Strings up to this length are deduplicated in the string heap
+_DEDUPE_MAX_LENGTH:int = 256
+
+_STATES:List[State] = [State.open, State.closed]
+
+# Issue field (see Issue.FIELDS) that each issue column is read for
+_COLUMN_FIELDS:Dict[str, str] = {
+    'issues.url': 'url',
+    'issues.creator': 'creator',
+    'issues.labels': 'labels',
+    'issues.label_is_json': 'labels',
+    'issues.label_offsets': 'labels',
+    'issues.state': 'state',
+    'issues.assignees': 'assignees',
+    'issues.assignee_is_json': 'assignees',
+    'issues.assignee_offsets': 'assignees',
+    'issues.title': 'title',
+    'issues.text': 'text',
+    'issues.number': 'number',
+    'issues.created': 'created_date',
+    'issues.updated': 'updated_date',
+    'issues.timeline_url': 'timeline_url',
+    'issues.event_offsets': 'events',
+}
+
+
+def store_path(data_path:str) -> str:
+    """
+    Path of the column store directory for a data file.
+    """
+    return sidecar.sidecar_path(data_path, COLUMN_STORE_SUFFIX)
+
+
+class ColumnStore:
+    """
+    Read-only, memory-mapped view of a column store.
+    """
+    
+    def __init__(self, path:str, manifest:Dict[str, any]):
+        """
+        Constructor. Use ColumnStore.open() to open a store.
+        """
+        self.path:str = path
+        self.manifest:Dict[str, any] = manifest
+        self.num_issues:int = manifest['num_issues']
+        self.num_events:int = manifest['num_events']
+        self.columns:Dict[str, np.ndarray] = {
+            name: self._map(f'{name}.bin', dtype) for name, dtype in manifest['columns'].items()}
+        self.string_offsets:np.ndarray = self._map('strings.offsets', 'int64')
+        self.heap:TextHeap = TextHeap.open(os.path.join(path, 'strings.heap'))
+        # Decoded short strings, by string id
+        self._strings:Dict[int, str] = {}
+        self._event_table:Optional[EventTable] = None
+    
+    @classmethod
+    def open(cls, data_path:str) -> Optional['ColumnStore']:
+        """
+        Opens the column store of a data file. Returns None if there is
+        no store or it is outdated or unreadable.
+        """
+        path = store_path(data_path)
+        manifest_path = os.path.join(path, 'manifest.json')
+        if not os.path.isfile(manifest_path):
+            return None
+        try:
+            with open(manifest_path, 'r') as fin:
+                manifest = json.load(fin)
+            if manifest.get('version') != FORMAT_VERSION:
+                logger.info(f'Ignoring column store {path} with format version {manifest.get("version")}')
+                return None
+            if not snapshot.is_valid(data_path, manifest.get('source', {})):
+                logger.info(f'Ignoring outdated column store {path}')
+                return None
+            return cls(path, manifest)
+        except Exception as e:
+            logger.warning(f'Could not open column store {path}: {e}')
+            return None
+    
+    def _map(self, filename:str, dtype:str) -> np.ndarray:
+        filepath = os.path.join(self.path, filename)
+        if os.path.getsize(filepath) == 0:
+            # Empty files cannot be memory-mapped
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(filepath, dtype=dtype, mode='r')
+    
+    def __getitem__(self, column:str) -> np.ndarray:
+        return self.columns[column]
+    
+    def string(self, string_id:int) -> Optional[str]:
+        """
+        Decodes a (short) string from the heap; None for -1.
+        """
+        if string_id < 0:
+            return None
+        value = self._strings.get(string_id)
+        if value is None:
+            value = self.text(string_id).decode()
+            self._strings[string_id] = value
+        return value
+    
+    def text(self, string_id:int) -> Optional[TextRef]:
+        """
+        Handle to a (long) string in the heap that is decoded on access; None for -1.
+        """
+        if string_id < 0:
+            return None
+        start = int(self.string_offsets[string_id])
+        return self.heap.ref(start, int(self.string_offsets[string_id + 1]) - start)
+    
+    def symbol_codes(self, column:str, table:SymbolTable) -> np.ndarray:
+        """
+        Translates a string id column into codes of a symbol table.
+        """
+        ids = self.columns[column]
+        unique_ids, inverse = np.unique(ids, return_inverse=True)
+        codes = np.array([table.code(self.string(int(i))) for i in unique_ids], dtype=np.int32)
+        return codes[inverse].astype(np.int32) if len(ids) else np.zeros(0, dtype=np.int32)
+    
+    def event_table(self) -> EventTable:
+        """
+        EventTable of the store. The event type, author and label columns
+        are translated into the codes of the process' symbol tables.
+        """
+        if self._event_table is None:
+            self._event_table = EventTable.from_columns(
+                issue=np.asarray(self.columns['events.issue']),
+                event_type=self.symbol_codes('events.event_type', EVENT_TYPES),
+                author=self.symbol_codes('events.author', USERS),
+                label=self.symbol_codes('events.label', LABELS),
+                timestamp=np.asarray(self.columns['events.timestamp']),
+                num_issues=self.num_issues,
+            )
+        return self._event_table
+    
+    def rows(self, issue_filter:IssueFilter=None) -> np.ndarray:
+        """
+        Rows of the issues that match a filter, evaluated on the
+        creation time and state columns.
+        """
+        if issue_filter is None or issue_filter.selects_all:
+            return np.arange(self.num_issues)
+        mask = np.ones(self.num_issues, dtype=bool)
+        if issue_filter.has_time_range:
+            created = self.columns['issues.created']
+            mask &= created != NO_TIMESTAMP
+            if issue_filter.created_after is not None:
+                mask &= created >= math.ceil(issue_filter.created_after)
+            if issue_filter.created_before is not None:
+                mask &= created < math.ceil(issue_filter.created_before)
+        if issue_filter.states is not None:
+            codes = [code for code, state in enumerate(_STATES) if state.value in issue_filter.states]
+            mask &= np.isin(self.columns['issues.state'], codes)
+        return np.flatnonzero(mask)
+    
+    def issues(self, off_heap:bool=True, fields:AbstractSet[str]=None,
+               event_fields:AbstractSet[str]=None, issue_filter:IssueFilter=None) -> List[Issue]:
+        """
+        Builds Issue objects from the store, in time linear in the number
+        of issues. Events are built when first accessed; titles, bodies and
+        comments stay in the mapped heap unless off_heap is False. If fields
+        (or event_fields) is given, only those fields of the issues (or
+        their events) are read. With an issue_filter, only the matching
+        issues are built.
+        """
+        fields = Issue.FIELDS if fields is None else fields
+        text = self.text if off_heap else lambda i: _decode(self.text(i))
+        cols = {name: self.columns[name].tolist() for name, field in _COLUMN_FIELDS.items() if field in fields}
+        issues = []
+        for row in self.rows(issue_filter).tolist():
+            issue = Issue()
+            if 'url' in fields:
+                issue.url = self.string(cols['issues.url'][row])
+            if 'creator' in fields:
+                issue.creator = self.string(cols['issues.creator'][row])
+            if 'labels' in fields:
+                offsets = cols['issues.label_offsets']
+                issue.labels = self._list(cols['issues.labels'], cols['issues.label_is_json'],
+                                          offsets[row], offsets[row + 1])
+            if 'state' in fields:
+                state = cols['issues.state'][row]
+                issue.state = _STATES[state] if state >= 0 else None
+            if 'assignees' in fields:
+                offsets = cols['issues.assignee_offsets']
+                issue.assignees = self._list(cols['issues.assignees'], cols['issues.assignee_is_json'],
+                                             offsets[row], offsets[row + 1])
+            if 'title' in fields:
+                issue.title = text(cols['issues.title'][row])
+            if 'text' in fields:
+                issue.text = text(cols['issues.text'][row])
+            if 'number' in fields:
+                issue.number = cols['issues.number'][row]
+            if 'created_date' in fields:
+                issue.created_date = sidecar.from_epoch(cols['issues.created'][row], NO_TIMESTAMP)
+            if 'updated_date' in fields:
+                issue.updated_date = sidecar.from_epoch(cols['issues.updated'][row], NO_TIMESTAMP)
+            if 'timeline_url' in fields:
+                issue.timeline_url = self.string(cols['issues.timeline_url'][row])
+            if 'events' in fields:
+                offsets = cols['issues.event_offsets']
+                issue.set_event_loader(partial(self._events, offsets[row], offsets[row + 1], text, event_fields))
+            issues.append(issue)
+        return issues
+    
+    def _list(self, string_ids:List[int], is_json:List[int], start:int, end:int) -> list:
+        return [json.loads(self.string(string_ids[i])) if is_json[i] else self.string(string_ids[i])
+                for i in range(start, end)]
+    
+    def _events(self, start:int, end:int, text, fields:AbstractSet[str]=None) -> List[Event]:
+        fields = Event.FIELDS if fields is None else fields
+        rows = {name: self.columns[f'events.{column}'][start:end].tolist()
+                for name, column in (('event_type', 'event_type'), ('author', 'author'),
+                                     ('event_date', 'timestamp'), ('label', 'label'),
+                                     ('comment', 'comment')) if name in fields}
+        events = []
+        for row in range(end - start):
+            event = Event(None)
+            if 'event_type' in fields:
+                event.event_type = self.string(rows['event_type'][row])
+            if 'author' in fields:
+                event.author = self.string(rows['author'][row])
+            if 'event_date' in fields:
+                event.event_date = sidecar.from_epoch(rows['event_date'][row], NO_TIMESTAMP)
+            if 'label' in fields:
+                event.label = self.string(rows['label'][row])
+            if 'comment' in fields:
+                event.comment = text(rows['comment'][row])
+            events.append(event)
+        return events
+
+
+def write(data_path:str, issues:List[Issue], source:Dict[str, any]=None) -> bool:
+    """
+    Writes the column store of a data file into a directory that
+    replaces the old store once complete.
+    """
+    path = store_path(data_path)
+    tmp_path = sidecar.temporary_path(path)
+    try:
+        os.makedirs(tmp_path, exist_ok=True)
+        strings = _StringHeapWriter(os.path.join(tmp_path, 'strings.heap'))
+        columns = _build_columns(issues, strings)
+        strings.close()
+        np.array(strings.offsets, dtype=np.int64).tofile(os.path.join(tmp_path, 'strings.offsets'))
+        for name, values in columns.items():
+            values.tofile(os.path.join(tmp_path, f'{name}.bin'))
+        manifest = {
+            'version': FORMAT_VERSION,
+            'source': source or snapshot.fingerprint(data_path),
+            'num_issues': len(issues),
+            'num_events': len(columns['events.issue']),
+            'num_strings': len(strings.offsets) - 1,
+            'columns': {name: values.dtype.name for name, values in columns.items()},
+        }
+        with open(os.path.join(tmp_path, 'manifest.json'), 'w') as fout:
+            json.dump(manifest, fout, indent=2)
+        _replace_dir(tmp_path, path)
+    except OSError as e:
+        logger.warning(f'Could not write column store {path}: {e}')
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        return False
+    return True
+
+
+def _replace_dir(src:str, dst:str):
+    # Directories cannot be replaced atomically, so move the old store
+    # out of the way first. Readers keep access to files they have mapped.
+    old = f'{dst}.{os.getpid()}.old'
+    if os.path.isdir(dst):
+        os.replace(dst, old)
+    os.replace(src, dst)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+class _StringHeapWriter:
+    
+    def __init__(self, path:str):
+        self.fout = open(path, 'wb')
+        self.offsets:List[int] = [0]
+        self.ids:Dict[str, int] = {}
+    
+    def add(self, value:Optional[str]) -> int:
+        if value is None:
+            return -1
+        dedupe = len(value) <= _DEDUPE_MAX_LENGTH
+        if dedupe and value in self.ids:
+            return self.ids[value]
+        data = value.encode('utf-8')
+        self.fout.write(data)
+        string_id = len(self.offsets) - 1
+        self.offsets.append(self.offsets[-1] + len(data))
+        if dedupe:
+            self.ids[value] = string_id
+        return string_id
+    
+    def close(self):
+        self.fout.close()
+
+
+def _build_columns(issues:List[Issue], strings:_StringHeapWriter) -> Dict[str, np.ndarray]:
+    cols:Dict[str, list] = {name: [] for name in (
+        'issues.number', 'issues.state', 'issues.created', 'issues.updated', 'issues.url',
+        'issues.creator', 'issues.title', 'issues.text', 'issues.timeline_url',
+        'issues.labels', 'issues.label_is_json', 'issues.assignees', 'issues.assignee_is_json', 'events.issue', 'events.timestamp',
+        'events.event_type', 'events.author', 'events.label', 'events.comment')}
+    label_offsets, assignee_offsets, event_offsets = [0], [0], [0]
+    for row, issue in enumerate(issues):
+        cols['issues.number'].append(issue.number)
+        cols['issues.state'].append(_STATES.index(issue.state) if issue.state is not None else -1)
+        cols['issues.created'].append(sidecar.to_epoch(issue.created_date, NO_TIMESTAMP))
+        cols['issues.updated'].append(sidecar.to_epoch(issue.updated_date, NO_TIMESTAMP))
+        for column, value in (('issues.url', issue.url), ('issues.creator', issue.creator),
+                              ('issues.title', issue.title), ('issues.text', issue.text),
+                              ('issues.timeline_url', issue.timeline_url)):
+            cols[column].append(strings.add(value))
+        for column, values, offsets in (('issues.labels', issue.labels, label_offsets),
+                                        ('issues.assignees', issue.assignees, assignee_offsets)):
+            for value in values:
+                is_json = not isinstance(value, str)
+                cols[column].append(strings.add(json.dumps(value) if is_json else value))
+                cols[column.rstrip('s') + '_is_json'].append(int(is_json))
+            offsets.append(len(cols[column]))
+        for event in issue.build_events():
+            cols['events.issue'].append(row)
+            cols['events.timestamp'].append(sidecar.to_epoch(event.event_date, NO_TIMESTAMP))
+            for column, value in (('events.event_type', event.event_type), ('events.author', event.author),
+                                  ('events.label', event.label), ('events.comment', event.comment)):
+                cols[column].append(strings.add(value))
+        event_offsets.append(len(cols['events.issue']))
+    
+    dtypes = {'issues.number': np.int64, 'issues.state': np.int8, 'issues.label_is_json': np.int8,
+              'issues.assignee_is_json': np.int8, 'issues.created': np.int64,
+              'issues.updated': np.int64, 'events.timestamp': np.int64}
+    columns = {name: np.array(values, dtype=dtypes.get(name, np.int32)) for name, values in cols.items()}
+    columns['issues.label_offsets'] = np.array(label_offsets, dtype=np.int64)
+    columns['issues.assignee_offsets'] = np.array(assignee_offsets, dtype=np.int64)
+    columns['issues.event_offsets'] = np.array(event_offsets, dtype=np.int64)
+    return columns
+
+
+def _decode(ref) -> Optional[str]:
+    return ref.decode() if ref is not None else None
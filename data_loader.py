@@ -1,43 +1,839 @@
-
+import bz2
+import gzip
 import json
-from typing import List
+import lzma
+import os
+import re
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+from typing import ContextManager, Dict, FrozenSet, Iterable, Iterator, List, Optional, TextIO, Tuple, Union
 
+import column_store
 import config
-from model import Issue
+import memory_report
+import snapshot
+import sqlite_store
+from column_store import ColumnStore
+from dataset_cache import CacheEntry, DatasetCache, LoadStats
+from event_table import EventTable
+from issue_filter import IssueFilter
+from issue_index import IssueIndex
+from label_index import LabelIndex, label_names
+from memory_report import LoadProfile
+from model import Issue, Event, State
+from sqlite_store import SqliteStore
+from text_heap import TextHeap
+from time_index import TimeIndex
+
+# Cache of the loaded datasets to avoid reloads (created on first use)
+_CACHE:DatasetCache = None
+
+# Number of characters read from the data file at a time while streaming
+_CHUNK_SIZE:int = 1 << 20
+
+_DECODER = json.JSONDecoder()
+_WHITESPACE = ' \t\n\r'
+# Characters that can follow an element of a JSON array
+_DELIMITERS = _WHITESPACE + ',]'
+
+# Data files with one JSON record per line (JSON Lines); any other data
+# file contains a JSON array of records
+_JSON_LINES_SUFFIXES:Tuple[str, ...] = ('.jsonl', '.ndjson')
+# Compressed data files are decompressed while they are streamed
+_DECOMPRESSORS = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}
+# Files read from a data directory
+_DATA_SUFFIXES:Tuple[str, ...] = tuple(suffix + compression
+                                       for suffix in ('.json',) + _JSON_LINES_SUFFIXES
+                                       for compression in [''] + list(_DECOMPRESSORS))
+
+# Start of an object that is an element of an array. This can also match
+# inside a string that ends with '[{' or ', {' (through its closing quote),
+# so candidates are verified by decoding them.
+_ELEMENT_START = re.compile(rb'[\[,][ \t\n\r]*(\{)[ \t\n\r]*"')
+# Number of bytes searched at a time for the start of a record
+_BOUNDARY_WINDOW:int = 1 << 16
 
-# Store issues as singleton to avoid reloads
-_ISSUES:List[Issue] = None
 
 class DataLoader:
     """
     Loads the issue data into a runtime object.
     """
     
-    def __init__(self):
+    def __init__(self, data_path:str=None):
         """
-        Constructor
+        Constructor. The data path defaults to the ENPM611_PROJECT_DATA_PATH
+        setting; pass another path to load a different dataset.
         """
-        self.data_path:str = config.get_parameter('ENPM611_PROJECT_DATA_PATH')
+        self.data_path:str = data_path or config.get_parameter('ENPM611_PROJECT_DATA_PATH')
+        # Whether to keep a binary snapshot of the parsed issues next to the data file
+        self.use_snapshot:bool = bool(config.get_parameter('ENPM611_PROJECT_SNAPSHOT', True))
+        # Whether to keep titles, bodies and comments in a memory-mapped text heap
+        self.use_text_heap:bool = bool(config.get_parameter('ENPM611_PROJECT_TEXT_HEAP', True))
+        # Whether to load the issues from a memory-mapped column store (see column_store)
+        self.use_column_store:bool = bool(config.get_parameter('ENPM611_PROJECT_COLUMN_STORE', False))
+        # Whether to load the issues from a SQLite database (see sqlite_store)
+        self.use_sqlite:bool = bool(config.get_parameter('ENPM611_PROJECT_SQLITE', False))
+        # Number of processes used to parse the data file (1 parses in this process)
+        self.workers:int = int(config.get_parameter('ENPM611_PROJECT_LOAD_WORKERS', 1))
+        # Column store the issues were last loaded from, if any
+        self.column_store:Optional[ColumnStore] = None
+        # Profile that records the phases of the load while get_memory_report() runs
+        self.memory_profile:Optional[LoadProfile] = None
         
-    def get_issues(self):
+    def get_issues(self, fields:Iterable[str]=None, event_fields:Iterable[str]=None,
+                   created_after:datetime=None, created_before:datetime=None,
+                   state:Union[State, str, Iterable[Union[State, str]]]=None):
         """
         This should be invoked by other parts of the application to get access
         to the issues in the data file.
+        
+        Analyses that only need some fields of the issues (see Issue.FIELDS)
+        or their events (see Event.FIELDS) can pass them as fields and
+        event_fields. The other fields are then neither parsed nor kept and
+        are left at their defaults.
+        
+        created_after (inclusive), created_before (exclusive) and state
+        restrict the result to the matching issues (see IssueFilter). The
+        other issues are skipped while loading, using the time index of
+        the snapshot or column store if there is one.
+        
+        Loaded issues are kept in a cache shared by all loaders, per data
+        file and selection of fields. The data file is checked for changes
+        (by its size and modification time) on every call and reloaded when
+        it changed, see get_load_stats(). Filtered loads are not cached
+        since their bounds usually depend on the current time, but they are
+        served from the cached issues if those are loaded already (with the
+        fields that the filter checks).
+        """
+        fields, event_fields = _normalise_fields(fields, event_fields)
+        issue_filter = IssueFilter(created_after, created_before, state)
+        key = self._cache_key(fields, event_fields)
+        entry = _cache().get(key)
+        if not issue_filter.selects_all:
+            # A cached projection can only be filtered if it has the fields the filter checks
+            if entry is None or (fields is not None and not issue_filter.fields <= fields):
+                entry = _cache().get(self._cache_key(None, None))
+            if entry is not None:
+                return self._filter_cached(entry, issue_filter)
+            issues = self._load(fields, event_fields, issue_filter)
+            print(f'Loaded {len(issues)} matching issues from {self.data_path}.')
+            return issues
+        if entry is None:
+            entry = self._load_entry(key, fields, event_fields)
+        return entry.issues
+    
+    def get_load_stats(self) -> LoadStats:
+        """
+        How often the issues of the data file were loaded and reloaded
+        in this process, and how long that took.
+        """
+        return _cache().stats.get(os.path.realpath(self.data_path), LoadStats())
+    
+    def get_memory_report(self, fields:Iterable[str]=None, event_fields:Iterable[str]=None) -> LoadProfile:
+        """
+        Loads the issues again (bypassing the cache) while tracing memory
+        allocations, and reports the memory allocated in each phase of the
+        load, the peak resident set size during the load and the bytes held
+        by the loaded issues, events, strings, dates and texts (titles, bodies
+        and comments), on the Python heap and in memory-mapped files (see
+        memory_report). The events of all issues are built so that they are
+        included. Tracing slows the load down several times.
+        """
+        fields, event_fields = _normalise_fields(fields, event_fields)
+        profile = LoadProfile()
+        event_table = None
+        self.memory_profile = profile
+        try:
+            with profile.tracking():
+                issues = self._load(fields, event_fields)
+                if fields is None or 'events' in fields:
+                    with profile.phase('build events'):
+                        for issue in issues:
+                            issue.events
+                    with profile.phase('event table'):
+                        event_table = EventTable.from_issues(issues)
+        finally:
+            self.memory_profile = None
+        profile.sizes = memory_report.measure(issues, {'event table': event_table.nbytes}
+                                              if event_table is not None else None)
+        return profile
+    
+    def get_event_table(self) -> EventTable:
+        """
+        Columnar view of the events of all issues returned by get_issues().
+        The issue column refers to positions in that list.
+        """
+        issues = self.get_issues()
+        entry = _cache().get(self._cache_key(None, None))
+        if entry.event_table is None:
+            if entry.column_store is not None:
+                entry.set_event_table(entry.column_store.event_table())
+            else:
+                entry.set_event_table(EventTable.from_issues(issues))
+            _cache().evict()
+        return entry.event_table
+    
+    def get_issue_index(self) -> IssueIndex:
         """
-        global _ISSUES # to access it within the function
-        if _ISSUES is None:
-            _ISSUES = self._load()
-            print(f'Loaded {len(_ISSUES)} issues from {self.data_path}.')
-        return _ISSUES
+        Indexes of the issues returned by get_issues() by number, creator,
+        label, state, assignee and event author, built on first request.
+        """
+        issues = self.get_issues()
+        entry = _cache().get(self._cache_key(None, None))
+        if entry.issue_index is None:
+            entry.issue_index = IssueIndex(issues)
+        return entry.issue_index
+    
+    def get_label_index(self) -> LabelIndex:
+        """
+        Bitmaps of the issues returned by get_issues() per label and label
+        family (e.g. 'area/*') for label predicates, built on first request.
+        """
+        issues = self.get_issues()
+        entry = _cache().get(self._cache_key(None, None))
+        if entry.label_index is None:
+            entry.label_index = LabelIndex.from_issues(issues)
+        return entry.label_index
+    
+    def get_time_index(self) -> TimeIndex:
+        """
+        Sorted index of the created, updated and event dates of the issues
+        returned by get_issues() for time range and sliding window queries,
+        built on first request. Its event rows refer to get_event_table().
+        """
+        self.get_issues()
+        return self._time_index(_cache().get(self._cache_key(None, None)))
+    
+    def open_column_store(self) -> ColumnStore:
+        """
+        Opens the memory-mapped column store of the data file, writing
+        it first if there is no up-to-date store.
+        """
+        store = ColumnStore.open(self.data_path)
+        if store is None:
+            source = snapshot.fingerprint(self.data_path)
+            # The snapshot includes the deltas applied to the data file
+            issues = snapshot.load(self.data_path) if self.use_snapshot else None
+            column_store.write(self.data_path, issues if issues is not None else self._parse(), source)
+            store = ColumnStore.open(self.data_path)
+        return store
     
-    def _load(self):
+    def open_sqlite_store(self) -> SqliteStore:
         """
-        Loads the issues into memory.
+        Opens the SQLite database of the data file for queries that filter
+        or group in SQL, ingesting the data first if there is no up-to-date
+        database.
+        """
+        store = SqliteStore.open(self.data_path)
+        if store is None:
+            source = snapshot.fingerprint(self.data_path)
+            # The snapshot includes the deltas applied to the data file
+            issues = snapshot.load(self.data_path, off_heap=False) if self.use_snapshot else None
+            sqlite_store.write(self.data_path, issues if issues is not None else self._parse(), source)
+            store = SqliteStore.open(self.data_path)
+        return store
+    
+    def apply_delta(self, path:str) -> Tuple[int, int]:
+        """
+        Merges a delta file (in any of the formats of the data file, e.g. an
+        export of the issues that changed since the data file was written)
+        into the loaded issues: issues are matched by number, their fields
+        are replaced and the events that are new are appended. Issues that
+        are not in the data yet are added at the end.
+        
+        The event table, issue index and label index are updated with the
+        delta issues only, and the delta is appended to the snapshot (or a
+        snapshot of the merged issues is written if there is none) so that
+        later runs load the merged issues without parsing the delta again.
+        An existing column store cannot be appended to and is rewritten from
+        the merged issues; in an existing SQLite database only the delta
+        issues are replaced. With the snapshot disabled, the delta only
+        applies to this process.
+        
+        Returns the number of updated and added issues.
+        """
+        key = self._cache_key(None, None)
+        issues = self.get_issues()
+        entry = _cache().get(key)
+        delta = self._parse_files(_source_files(path))
+        
+        index = self.get_issue_index()
+        changed = []
+        updated = 0
+        for issue in delta:
+            pos = index.position(issue.number)
+            old = issues[pos] if pos is not None else None
+            if old is None:
+                pos = len(issues)
+                issues.append(issue)
+            else:
+                known = {_event_key(event) for event in old.events}
+                issue.events = old.events + [event for event in issue.events if _event_key(event) not in known]
+                issues[pos] = issue
+                updated += 1
+            index.update(pos, old)
+            if entry.label_index is not None:
+                entry.label_index.update(pos, label_names(old.labels) if old is not None else [],
+                                         label_names(issue.labels))
+            changed.append(pos)
+        
+        if entry.event_table is not None:
+            entry.event_table = entry.event_table.update(changed, [issues[pos] for pos in changed], len(issues))
+        entry.column_store = None
+        # Re-sorting the dates is cheap compared to parsing, so the time index is rebuilt when needed
+        entry.time_index = None
+        entry.size = memory_report.estimate(issues) + (entry.event_table.nbytes if entry.event_table else 0)
+        # Projections of the data would be outdated
+        _cache().invalidate(key[0], keep=key)
+        
+        if self.use_snapshot and not snapshot.append_delta(self.data_path, delta, snapshot.fingerprint(path)):
+            # There is no up-to-date snapshot to append to, e.g. if the issues were
+            # loaded from the column store or database, so the merged issues are saved
+            snapshot.save(self.data_path, issues)
+        if self.use_column_store or os.path.isdir(column_store.store_path(self.data_path)):
+            column_store.write(self.data_path, issues, snapshot.fingerprint(self.data_path))
+        if self.use_sqlite or os.path.isfile(sqlite_store.database_path(self.data_path)):
+            store = self.open_sqlite_store()
+            if store is not None:
+                store.upsert((pos, issues[pos]) for pos in changed)
+        print(f'Applied {path}: updated {updated} and added {len(delta) - updated} issues.')
+        return updated, len(delta) - updated
+    
+    def iter_issues(self, fields:Iterable[str]=None, event_fields:Iterable[str]=None,
+                    created_after:datetime=None, created_before:datetime=None,
+                    state:Union[State, str, Iterable[Union[State, str]]]=None) -> Iterator[Issue]:
         """
-        with open(self.data_path,'r') as fin:
-            return [Issue(i) for i in json.load(fin)]
+        Yields the issues in the data file one at a time without holding
+        the whole file (or all issues) in memory. Use this for analyses that
+        only aggregate over the issues and do not need random access.
+        
+        The data path can be a file containing a JSON array of issues, a
+        JSON Lines file (.jsonl) with one issue per line, or a directory of
+        such files (shards), which are read in the order of their names.
+        Files compressed with gzip (.gz), bzip2 (.bz2) or xz (.xz) are
+        decompressed while they are read.
+        
+        fields and event_fields select the fields to parse and created_after,
+        created_before and state the issues to yield, as in get_issues().
+        """
+        fields, event_fields = _normalise_fields(fields, event_fields)
+        issue_filter = IssueFilter(created_after, created_before, state)
+        heap = TextHeap() if self.use_text_heap else None
+        for path in _source_files(self.data_path):
+            yield from _build_issues(_iter_records(path), heap, fields, event_fields, issue_filter)
+    
+    def _load(self, fields:FrozenSet[str]=None, event_fields:FrozenSet[str]=None,
+              issue_filter:IssueFilter=None):
+        """
+        Loads the issues into memory, from the column store, the SQLite
+        database or the snapshot of the data file if enabled and up to date,
+        and by parsing the data file otherwise. Only the full, unfiltered
+        load writes the snapshot.
+        """
+        self.column_store = None
+        if self.use_column_store:
+            with self._phase('open column store'):
+                self.column_store = self.open_column_store()
+            if self.column_store is not None:
+                with self._phase('read column store'):
+                    return self.column_store.issues(self.use_text_heap, fields, event_fields, issue_filter)
+        if self.use_sqlite:
+            with self._phase('open database'):
+                store = self.open_sqlite_store()
+            if store is not None:
+                with self._phase('read database'):
+                    return store.issues(fields, event_fields, issue_filter)
+        
+        if not self.use_snapshot:
+            with self._phase('parse'):
+                return self._parse(fields, event_fields, issue_filter)
+        
+        with self._phase('read snapshot'):
+            issues = snapshot.load(self.data_path, self.use_text_heap, fields, event_fields, issue_filter)
+        if issues is not None:
+            return issues
+        with self._phase('parse'):
+            if fields is not None or event_fields is not None or issue_filter is not None:
+                return self._parse(fields, event_fields, issue_filter)
+            source = snapshot.fingerprint(self.data_path)
+            issues = self._parse()
+        with self._phase('write snapshot'):
+            snapshot.save(self.data_path, issues, source)
+        return issues
+    
+    def _phase(self, name:str) -> ContextManager:
+        """
+        Context in which a phase of a load runs, which records its memory
+        allocations while get_memory_report() runs.
+        """
+        return self.memory_profile.phase(name) if self.memory_profile is not None else nullcontext()
+    
+    def _load_entry(self, key:tuple, fields:Optional[FrozenSet[str]],
+                    event_fields:Optional[FrozenSet[str]]) -> CacheEntry:
+        """
+        Loads the issues into a new cache entry. If the cache holds the
+        issues of an earlier version of a data directory to which shard
+        files were only added, just the added files are parsed and their
+        issues appended.
+        """
+        files = _file_stats(self.data_path)
+        outdated = _cache().outdated(key)
+        added = None
+        if outdated is not None and not self.use_column_store:
+            added = _added_files(outdated.files, files)
+        
+        start = time.perf_counter()
+        if added is not None:
+            self.column_store = None
+            issues = outdated.issues + self._parse_files(added, fields, event_fields)
+        else:
+            issues = self._load(fields, event_fields)
+        seconds = time.perf_counter() - start
+        
+        entry = CacheEntry(issues, memory_report.estimate(issues))
+        entry.column_store = self.column_store
+        entry.files = files
+        _cache().put(key, entry, seconds, merged=added is not None)
+        projection = '' if fields is None and event_fields is None \
+            else f' (fields: {", ".join(sorted(fields or Issue.FIELDS))})'
+        if outdated is None:
+            print(f'Loaded {len(issues)} issues from {self.data_path}{projection}.')
+        else:
+            print(f'Reloaded {len(issues)} issues from {self.data_path}{projection} '
+                  f'after it changed ({seconds:.2f}s).')
+        return entry
+    
+    def _time_index(self, entry:CacheEntry) -> TimeIndex:
+        """
+        Time index of a cache entry. Only the index of the full load can
+        answer event queries.
+        """
+        if entry.time_index is None:
+            full = _cache().get(self._cache_key(None, None)) is entry
+            entry.time_index = TimeIndex(entry.issues, self.get_event_table if full else None)
+        return entry.time_index
+    
+    def _filter_cached(self, entry:CacheEntry, issue_filter:IssueFilter) -> List[Issue]:
+        """
+        The cached issues that match a filter. A time range is looked up in
+        the time index of the entry.
+        """
+        if not issue_filter.has_time_range:
+            return [issue for issue in entry.issues if issue_filter.matches_issue(issue)]
+        issues = self._time_index(entry).issues_between(issue_filter.created_after, issue_filter.created_before)
+        if issue_filter.states is not None:
+            issues = [issue for issue in issues
+                      if issue.state is not None and issue.state.value in issue_filter.states]
+        return issues
+    
+    def _cache_key(self, fields:Optional[FrozenSet[str]], event_fields:Optional[FrozenSet[str]]) -> tuple:
+        """
+        Identifies a load of the current contents of the data file.
+        """
+        fingerprint = snapshot.fingerprint(self.data_path, with_hash=False)
+        return (os.path.realpath(self.data_path), tuple(sorted(fingerprint.items())), fields, event_fields)
+    
+    def _parse(self, fields:FrozenSet[str]=None, event_fields:FrozenSet[str]=None,
+               issue_filter:IssueFilter=None) -> List[Issue]:
+        """
+        Parses all (matching) issues in the data file, in parallel if more
+        than one worker is configured.
+        """
+        if self.workers <= 1:
+            return self._parse_files(_source_files(self.data_path), fields, event_fields, issue_filter)
+        return self._parse_parallel(fields, event_fields, issue_filter)
+    
+    def _parse_files(self, paths:List[str], fields:FrozenSet[str]=None, event_fields:FrozenSet[str]=None,
+                     issue_filter:IssueFilter=None) -> List[Issue]:
+        """
+        Parses the (matching) issues in the given data files in this process.
+        """
+        heap = TextHeap() if self.use_text_heap else None
+        return [issue for path in paths
+                for issue in _build_issues(_iter_records(path), heap, fields, event_fields, issue_filter)]
+    
+    def _parse_parallel(self, fields:FrozenSet[str]=None, event_fields:FrozenSet[str]=None,
+                        issue_filter:IssueFilter=None) -> List[Issue]:
+        """
+        Splits the data file(s) into byte ranges at record boundaries and
+        parses each range in a separate process. Texts are written to a
+        heap file per range that the issues returned by the workers refer to.
+        """
+        files = _source_files(self.data_path)
+        shards_per_file = max(1, self.workers * 4 // max(1, len(files)))
+        tasks = [(path, byte_range) for path in files for byte_range in _shard_ranges(path, shards_per_file)]
+        heap_dir = tempfile.mkdtemp(prefix='enpm611-heaps-') if self.use_text_heap else None
+        heap_paths = [os.path.join(heap_dir, f'{n}.heap') if heap_dir is not None else None
+                      for n in range(len(tasks))]
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                shards = executor.map(_parse_shard, [path for path, _ in tasks],
+                                      [byte_range for _, byte_range in tasks], heap_paths,
+                                      [fields] * len(tasks), [event_fields] * len(tasks),
+                                      [issue_filter] * len(tasks))
+                issues = [issue for shard in shards for issue in shard]
+        finally:
+            # The heaps stay accessible through the open (mapped) files
+            if heap_dir is not None:
+                shutil.rmtree(heap_dir, ignore_errors=True)
+        return issues
+
+
+def _cache() -> DatasetCache:
+    """
+    The cache of loaded datasets, with the memory budget set by
+    ENPM611_PROJECT_CACHE_MB (default 1024).
+    """
+    global _CACHE
+    if _CACHE is None:
+        _CACHE = DatasetCache(int(float(config.get_parameter('ENPM611_PROJECT_CACHE_MB', 1024)) * (1 << 20)))
+    return _CACHE
+
+
+def clear_cache():
+    """
+    Drops all loaded datasets from the cache.
+    """
+    _cache().clear()
+
+
+def _event_key(event:Event) -> tuple:
+    # Identifies an event when merging deltas (see snapshot.merge_records)
+    return (event.event_type, event.author, event.event_date, event.label)
+
+
+def _file_stats(data_path:str) -> Dict[str, Tuple[int, int]]:
+    """
+    Size and modification time of each data file of a data path.
+    """
+    stats = {}
+    for path in _source_files(data_path):
+        stat = os.stat(path)
+        stats[path] = (stat.st_size, stat.st_mtime_ns)
+    return stats
+
+
+def _added_files(old:Dict[str, Tuple[int, int]], new:Dict[str, Tuple[int, int]]) -> Optional[List[str]]:
+    """
+    The data files that were added to a data directory, if all earlier
+    files are unchanged and the added files sort after them (so their
+    issues come last). Returns None otherwise.
+    """
+    if not old or any(new.get(path) != stat for path, stat in old.items()):
+        return None
+    added = [path for path in new if path not in old]
+    if not added or min(added) < max(old):
+        return None
+    return added
+
+
+def _normalise_fields(fields:Optional[Iterable[str]], event_fields:Optional[Iterable[str]]
+                      ) -> Tuple[Optional[FrozenSet[str]], Optional[FrozenSet[str]]]:
+    """
+    Validates the fields selected for a load. Selecting all fields is
+    the same as not selecting any, and selecting event fields implies
+    that the events are loaded.
+    """
+    if fields is not None:
+        fields = frozenset(fields)
+        if event_fields is not None:
+            fields |= {'events'}
+        unknown = fields - Issue.FIELDS
+        if unknown:
+            raise ValueError(f'Unknown issue fields: {", ".join(sorted(unknown))}')
+        if fields == Issue.FIELDS:
+            fields = None
+    if event_fields is not None:
+        event_fields = frozenset(event_fields)
+        unknown = event_fields - Event.FIELDS
+        if unknown:
+            raise ValueError(f'Unknown event fields: {", ".join(sorted(unknown))}')
+        if event_fields == Event.FIELDS:
+            event_fields = None
+    return fields, event_fields
+
+
+def _build_issues(records:Iterable[dict], heap:Optional[TextHeap], fields:Optional[FrozenSet[str]],
+                  event_fields:Optional[FrozenSet[str]], issue_filter:Optional[IssueFilter]) -> Iterator[Issue]:
+    """
+    Builds issues from raw records. Records that do not match the filter
+    are skipped before anything is built from them, and the fields that
+    are not selected are dropped so they are not kept along with the raw
+    events.
+    """
+    if issue_filter is not None and issue_filter.selects_all:
+        issue_filter = None
+    for jobj in records:
+        if issue_filter is not None and not issue_filter.matches_record(jobj):
+            continue
+        if fields is not None:
+            for key in [key for key in jobj if key not in fields]:
+                del jobj[key]
+        if event_fields is not None:
+            jobj['events'] = [{key: value for key, value in jevent.items() if key in event_fields}
+                              for jevent in jobj.get('events') or []]
+        if heap is not None:
+            _store_text_off_heap(jobj, heap)
+        yield Issue(jobj, fields, event_fields)
+
+
+def _source_files(data_path:str) -> List[str]:
+    """
+    Data files to read for a data path: the file itself or the data
+    files in a directory, sorted by name.
+    """
+    if not os.path.isdir(data_path):
+        return [data_path]
+    return sorted(os.path.join(data_path, name) for name in os.listdir(data_path)
+                  if name.endswith(_DATA_SUFFIXES) and os.path.isfile(os.path.join(data_path, name)))
+
+
+def _compression(path:str) -> Optional[str]:
+    """
+    Suffix of the compression of a data file (e.g. '.gz'), or None.
+    """
+    suffix = os.path.splitext(path)[1].lower()
+    return suffix if suffix in _DECOMPRESSORS else None
+
+
+def _is_json_lines(path:str) -> bool:
+    compression = _compression(path)
+    if compression is not None:
+        path = path[:-len(compression)]
+    return path.lower().endswith(_JSON_LINES_SUFFIXES)
+
+
+def _open_text(path:str) -> TextIO:
+    """
+    Opens a data file for reading text, decompressing it on the fly
+    if it is compressed.
+    """
+    compression = _compression(path)
+    if compression is not None:
+        return _DECOMPRESSORS[compression](path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def _iter_records(path:str) -> Iterator[dict]:
+    """
+    Streams the raw issue records of a single data file.
+    """
+    with _open_text(path) as fin:
+        if _is_json_lines(path):
+            for line in fin:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from _iter_json_array(fin)
+
+
+def _store_text_off_heap(jobj:dict, heap:TextHeap):
+    """
+    Replaces the title, body and comments of a raw issue record with
+    handles to the text in the heap.
+    """
+    for key in ('title', 'text'):
+        if isinstance(jobj.get(key), str):
+            jobj[key] = heap.add(jobj[key])
+    for jevent in jobj.get('events') or []:
+        if isinstance(jevent.get('comment'), str):
+            jevent['comment'] = heap.add(jevent['comment'])
+
+
+def _shard_ranges(path:str, num_shards:int) -> List[Tuple[int, int]]:
+    """
+    Splits a data file into up to num_shards byte ranges that each start
+    at a record and contain whole records. Compressed files cannot be
+    split and are returned as a single range.
+    """
+    size = os.path.getsize(path)
+    if _compression(path) is not None:
+        return [(0, size)]
+    next_start = _next_line_start if _is_json_lines(path) else _next_record_start
+    with open(path, 'rb') as fin:
+        starts = []
+        for shard in range(num_shards):
+            start = next_start(fin, size * shard // num_shards)
+            if start is None:
+                break
+            if not starts or start > starts[-1]:
+                starts.append(start)
+    return list(zip(starts, starts[1:] + [size]))
+
+
+def _next_line_start(fin, offset:int) -> Optional[int]:
+    """
+    Byte offset of the first line that starts at or after the given offset.
+    """
+    if offset == 0:
+        return 0
+    fin.seek(offset - 1)
+    fin.readline()
+    start = fin.tell()
+    return start if fin.read(1) else None
+
+
+def _next_record_start(fin, offset:int) -> Optional[int]:
+    """
+    Byte offset of the first top-level record (issue) that starts at or
+    after the given offset, or None if there is none. Candidate objects
+    are decoded to tell issues apart from nested objects such as events.
+    """
+    fin.seek(offset)
+    window = fin.read(_BOUNDARY_WINDOW)
+    # Include the byte before the offset so that a record starting right at it is found
+    if offset > 0:
+        fin.seek(offset - 1)
+        window = fin.read(len(window) + 1)
+        offset -= 1
+    pos = 0
+    while True:
+        match = _ELEMENT_START.search(window, pos)
+        if match is None:
+            more = fin.read(_BOUNDARY_WINDOW)
+            if not more:
+                return None
+            pos = max(0, len(window) - 64)
+            window += more
+            continue
+        brace = match.start(1)
+        text = window[brace:].decode('utf-8', errors='replace')
+        try:
+            obj, _ = _DECODER.raw_decode(text)
+        except json.JSONDecodeError as e:
+            if not _is_truncated(e, text):
+                # Not an object, e.g. a match inside a string
+                pos = brace + 1
+                continue
+            # The candidate object extends past the window
+            more = fin.read(max(len(window), _BOUNDARY_WINDOW))
+            if not more:
+                return None
+            window += more
+            continue
+        if _is_issue_record(obj):
+            return offset + brace
+        pos = brace + 1
+
+
+def _is_truncated(error:json.JSONDecodeError, text:str) -> bool:
+    """
+    Whether decoding failed because the text ended, rather than because
+    it is not valid JSON. An unterminated string always runs to the end.
+    """
+    return error.pos >= len(text.rstrip()) or error.msg.startswith('Unterminated string')
+
+
+def _is_issue_record(obj:any) -> bool:
+    # Events and assignees are objects too, but have no number and state
+    return isinstance(obj, dict) and 'number' in obj and 'state' in obj
+
+
+def _parse_shard(path:str, byte_range:Tuple[int, int], heap_path:Optional[str],
+                 fields:Optional[FrozenSet[str]]=None, event_fields:Optional[FrozenSet[str]]=None,
+                 issue_filter:Optional[IssueFilter]=None) -> List[Issue]:
+    """
+    Parses the records in a byte range of a data file (run in a worker
+    process). Texts are written to a heap file at heap_path, if given.
+    """
+    heap = TextHeap.create(heap_path) if heap_path is not None else None
+    if _compression(path) is not None:
+        records = _iter_records(path)
+    else:
+        start, end = byte_range
+        with open(path, 'rb') as fin:
+            fin.seek(start)
+            text = fin.read(end - start).decode('utf-8')
+        records = _iter_shard_records(text, _is_json_lines(path))
+    return list(_build_issues(records, heap, fields, event_fields, issue_filter))
+
+
+def _iter_shard_records(text:str, json_lines:bool) -> Iterator[dict]:
+    """
+    Parses the records in a range returned by _shard_ranges().
+    """
+    if json_lines:
+        for line in text.splitlines():
+            if line.strip():
+                yield json.loads(line)
+        return
+    pos = 0
+    while True:
+        # Records are separated by commas; the last range ends with the closing bracket
+        while pos < len(text) and text[pos] in _WHITESPACE + ',':
+            pos += 1
+        if pos >= len(text) or text[pos] == ']':
+            return
+        jobj, pos = _DECODER.raw_decode(text, pos)
+        yield jobj
+
+
+def _iter_json_array(fin:TextIO, chunk_size:int=_CHUNK_SIZE) -> Iterator[any]:
+    """
+    Incrementally parses a file containing a top-level JSON array and
+    yields its elements one by one. Only the current element and one
+    read chunk are buffered at any time.
+    """
+    buf:str = fin.read(chunk_size)
+    pos:int = 0
+    eof:bool = not buf
+    expect_value:bool = True
+    started:bool = False
+
+    while True:
+        # Skip whitespace, refilling the buffer when it runs out
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf) or eof:
+                break
+            buf, pos = fin.read(chunk_size), 0
+            eof = not buf
+
+        if pos >= len(buf):
+            raise ValueError('Unexpected end of data while reading JSON array')
+
+        char = buf[pos]
+        if not started:
+            if char != '[':
+                raise ValueError('Data file must contain a JSON array of issues')
+            started = True
+            pos += 1
+            continue
+        if char == ']':
+            return
+        if not expect_value:
+            if char != ',':
+                raise ValueError(f'Expected "," between array elements, found {char!r}')
+            expect_value = True
+            pos += 1
+            continue
+
+        try:
+            value, end = _DECODER.raw_decode(buf, pos)
+            # A value is only complete once the delimiter after it has been
+            # read; a number split across two chunks (e.g. at '.' or 'e')
+            # decodes as a shorter number
+            complete = eof or (end < len(buf) and buf[end] in _DELIMITERS)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+        if not complete:
+            chunk = fin.read(chunk_size)
+            eof = not chunk
+            buf, pos = buf[pos:] + chunk, 0
+            continue
+
+        yield value
+        pos = end
+        expect_value = False
     
 
 if __name__ == '__main__':
     # Run the loader for testing
-    DataLoader().get_issues()
\ No newline at end of file
+    DataLoader().get_issues()
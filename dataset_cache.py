@@ -0,0 +1,156 @@
+"""
+In-process cache of loaded datasets. Entries are keyed by the resolved
+path of the data file and its fingerprint (see snapshot.fingerprint), so a
+changed data file or data path never returns stale issues and several
+datasets can be kept loaded side by side. Once the estimated size of the
+entries exceeds the memory budget, the least recently used entries are
+evicted.
+
+The cache also counts how often each data file was loaded and reloaded
+(after it changed) and how long that took, see LoadStats.
+"""
+
+import logging
+logger = logging.getLogger(__name__)
+
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from column_store import ColumnStore
+from event_table import EventTable
+from issue_index import IssueIndex
+from label_index import LabelIndex
+from model import Issue
+from time_index import TimeIndex
+
+
+class CacheEntry:
+    """
+    The issues loaded from one dataset (with one selection of fields) and
+    the views built from them.
+    """
+
+    def __init__(self, issues:List[Issue], size:int):
+        self.issues:List[Issue] = issues
+        # Estimated size of the issues in bytes
+        self.size:int = size
+        self.event_table:Optional[EventTable] = None
+        self.issue_index:Optional[IssueIndex] = None
+        self.time_index:Optional[TimeIndex] = None
+        self.label_index:Optional[LabelIndex] = None
+        # Memory-mapped column store the issues were loaded from, if any
+        self.column_store:Optional[ColumnStore] = None
+        # Size and modification time of each data file the issues were loaded from
+        self.files:Dict[str, Tuple[int, int]] = {}
+
+    def set_event_table(self, event_table:EventTable):
+        self.event_table = event_table
+        self.size += event_table.nbytes
+
+
+class LoadStats:
+    """
+    How often the issues of a data file were loaded into the cache and
+    how long that took.
+    """
+
+    def __init__(self):
+        self.loads:int = 0
+        # Loads that replaced issues loaded before the data file changed
+        self.reloads:int = 0
+        # Reloads that only parsed the files added to a data directory
+        self.merges:int = 0
+        self.last_load_seconds:float = 0.0
+        self.total_load_seconds:float = 0.0
+
+    def __repr__(self) -> str:
+        return (f'LoadStats(loads={self.loads}, reloads={self.reloads}, merges={self.merges}, '
+                f'last_load_seconds={self.last_load_seconds:.3f}, '
+                f'total_load_seconds={self.total_load_seconds:.3f})')
+
+
+class DatasetCache:
+    """
+    LRU cache of CacheEntry objects. Keys are tuples starting with the
+    resolved data path and the fingerprint of the data.
+    """
+
+    def __init__(self, budget:int):
+        # Memory budget in bytes
+        self.budget:int = budget
+        self._entries:'OrderedDict[Tuple, CacheEntry]' = OrderedDict()
+        # Load statistics by data path
+        self.stats:Dict[str, LoadStats] = {}
+
+    def get(self, key:Tuple) -> Optional[CacheEntry]:
+        """
+        Returns the entry for a key (marking it as recently used), or None.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def outdated(self, key:Tuple) -> Optional[CacheEntry]:
+        """
+        Returns the entry that was loaded with the same path and fields
+        as the key from an earlier version of the data, or None.
+        """
+        for old_key, entry in self._entries.items():
+            if old_key[0] == key[0] and old_key[1] != key[1] and old_key[2:] == key[2:]:
+                return entry
+        return None
+
+    def put(self, key:Tuple, entry:CacheEntry, seconds:float=0.0, merged:bool=False):
+        """
+        Adds an entry that took the given number of seconds to load.
+        Entries of the same path with a different fingerprint are outdated
+        and dropped; replacing one counts as a reload. The new entry is kept
+        even if it exceeds the budget on its own.
+        """
+        path, fingerprint = key[0], key[1]
+        outdated = [k for k in self._entries if k[0] == path and k[1] != fingerprint]
+        for old_key in outdated:
+            del self._entries[old_key]
+        stats = self.stats.setdefault(path, LoadStats())
+        stats.loads += 1
+        stats.reloads += 1 if outdated else 0
+        stats.merges += 1 if merged else 0
+        stats.last_load_seconds = seconds
+        stats.total_load_seconds += seconds
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        self.evict()
+
+    def evict(self):
+        """
+        Evicts the least recently used entries until the cache fits
+        within the budget (or only the most recent entry is left).
+        """
+        while len(self._entries) > 1 and self.size > self.budget:
+            key, entry = self._entries.popitem(last=False)
+            logger.info(f'Evicted {len(entry.issues)} issues of {key[0]} '
+                        f'({entry.size / (1 << 20):.1f} MB) from the cache')
+
+    def invalidate(self, path:str, keep:Tuple=None):
+        """
+        Drops the entries of a path, except the one with the key keep.
+        """
+        for key in [k for k in self._entries if k[0] == path and k != keep]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
+
+    @property
+    def size(self) -> int:
+        """
+        Estimated size of all entries in bytes.
+        """
+        return sum(entry.size for entry in self._entries.values())
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key:Tuple) -> bool:
+        return key in self._entries
@@ -0,0 +1,167 @@
+"""
+Columnar (struct-of-arrays) view of all events of a dataset, so that
+counting, first-occurrence and windowing queries can be answered with
+NumPy operations instead of loops over Event objects.
+"""
+
+from typing import List, Optional
+
+import numpy as np
+
+from model import Issue
+from symbols import EVENT_TYPES, USERS, LABELS, NO_CODE
+
+# Timestamp used for events without a date. It is the smallest int64,
+# so those events sort before all other events of their issue.
+NO_TIMESTAMP:int = np.iinfo(np.int64).min
+
+
+class EventTable:
+    """
+    All events of a list of issues as equally long NumPy columns,
+    sorted by issue and then by time:
+
+        issue       int32  position of the issue in the issue list
+        event_type  int32  code in symbols.EVENT_TYPES
+        author      int32  code in symbols.USERS (NO_CODE if missing)
+        label       int32  code in symbols.LABELS (NO_CODE if missing)
+        timestamp   int64  UTC seconds since the epoch (NO_TIMESTAMP if missing)
+    """
+    
+    def __init__(self, issue:np.ndarray, event_type:np.ndarray, author:np.ndarray,
+                 label:np.ndarray, timestamp:np.ndarray, num_issues:int):
+        """
+        Constructor. The columns must already be sorted by issue and time.
+        """
+        self.issue:np.ndarray = issue
+        self.event_type:np.ndarray = event_type
+        self.author:np.ndarray = author
+        self.label:np.ndarray = label
+        self.timestamp:np.ndarray = timestamp
+        self.num_issues:int = num_issues
+        # Row range of the events of each issue: offsets[i]:offsets[i+1]
+        self.offsets:np.ndarray = np.searchsorted(issue, np.arange(num_issues + 1), side='left')
+    
+    @classmethod
+    def from_issues(cls, issues:List[Issue], positions:List[int]=None, num_issues:int=None) -> 'EventTable':
+        """
+        Builds the table from the events of the issues. Events that have
+        not been accessed yet are not materialised on the issues. If the
+        issues are only some of the issue list, positions gives their
+        positions in the list and num_issues its length.
+        """
+        if positions is None:
+            positions = range(len(issues))
+        issue_col, type_col, author_col, label_col, time_col = [], [], [], [], []
+        for position, issue in zip(positions, issues):
+            for event in issue.build_events():
+                issue_col.append(position)
+                type_col.append(event.event_type_code)
+                author_col.append(event.author_code)
+                label_col.append(event.label_code)
+                time_col.append(int(event.event_date.timestamp()) if event.event_date is not None else NO_TIMESTAMP)
+        
+        return cls.from_columns(
+            issue=np.array(issue_col, dtype=np.int32),
+            event_type=np.array(type_col, dtype=np.int32),
+            author=np.array(author_col, dtype=np.int32),
+            label=np.array(label_col, dtype=np.int32),
+            timestamp=np.array(time_col, dtype=np.int64),
+            num_issues=len(issues) if num_issues is None else num_issues,
+        )
+    
+    @classmethod
+    def from_columns(cls, issue:np.ndarray, event_type:np.ndarray, author:np.ndarray,
+                     label:np.ndarray, timestamp:np.ndarray, num_issues:int) -> 'EventTable':
+        """
+        Builds the table from unsorted columns.
+        """
+        order = np.lexsort((timestamp, issue))
+        return cls(issue=issue[order], event_type=event_type[order], author=author[order],
+                   label=label[order], timestamp=timestamp[order], num_issues=num_issues)
+    
+    def update(self, positions:List[int], issues:List[Issue], num_issues:int) -> 'EventTable':
+        """
+        Table with the events of the issues at the given positions replaced
+        by the events of the given issues, e.g. after a delta was merged into
+        the issue list (positions past the old end are added issues). Only
+        the events of the given issues are converted.
+        """
+        changed = EventTable.from_issues(issues, positions, num_issues)
+        keep = ~np.isin(self.issue, np.asarray(positions, dtype=np.int32))
+        return EventTable.from_columns(
+            issue=np.concatenate((self.issue[keep], changed.issue)),
+            event_type=np.concatenate((self.event_type[keep], changed.event_type)),
+            author=np.concatenate((self.author[keep], changed.author)),
+            label=np.concatenate((self.label[keep], changed.label)),
+            timestamp=np.concatenate((self.timestamp[keep], changed.timestamp)),
+            num_issues=num_issues,
+        )
+    
+    def __len__(self) -> int:
+        return len(self.issue)
+    
+    @property
+    def nbytes(self) -> int:
+        """
+        Memory taken up by the columns. Columns that are views of other
+        arrays (e.g. memory-mapped files) are not counted.
+        """
+        return sum(column.nbytes for column in (self.issue, self.event_type, self.author,
+                                                self.label, self.timestamp, self.offsets)
+                   if column.base is None)
+    
+    def mask(self, event_type:Optional[str]=None, author:Optional[str]=None,
+             label:Optional[str]=None) -> np.ndarray:
+        """
+        Boolean mask of the events matching all of the given values.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        for column, table, value in ((self.event_type, EVENT_TYPES, event_type),
+                                     (self.author, USERS, author),
+                                     (self.label, LABELS, label)):
+            if value is not None:
+                mask &= column == table.lookup(value)
+        return mask
+    
+    def counts_per_issue(self, mask:Optional[np.ndarray]=None) -> np.ndarray:
+        """
+        Number of events (optionally only those selected by a mask) per issue.
+        """
+        issues = self.issue if mask is None else self.issue[mask]
+        return np.bincount(issues, minlength=self.num_issues)
+    
+    def counts_per_event_type(self, mask:Optional[np.ndarray]=None) -> np.ndarray:
+        """
+        Matrix of event counts with one row per issue and one column per
+        event type code.
+        """
+        issues = self.issue if mask is None else self.issue[mask]
+        types = self.event_type if mask is None else self.event_type[mask]
+        # Events without a type are not counted
+        known = types != NO_CODE
+        issues, types = issues[known], types[known]
+        num_types = len(EVENT_TYPES)
+        counts = np.bincount(issues.astype(np.int64) * num_types + types,
+                             minlength=self.num_issues * num_types)
+        return counts.reshape(self.num_issues, num_types)
+    
+    def first_occurrence(self, event_type:str) -> np.ndarray:
+        """
+        Timestamp of the first event of a type per issue (NO_TIMESTAMP
+        for issues without such an event).
+        """
+        mask = self.mask(event_type=event_type) & (self.timestamp != NO_TIMESTAMP)
+        issues = self.issue[mask]
+        times = self.timestamp[mask]
+        first = np.full(self.num_issues, NO_TIMESTAMP, dtype=np.int64)
+        # Events are sorted by issue and time, so the first row of each issue is the earliest
+        unique_issues, first_rows = np.unique(issues, return_index=True)
+        first[unique_issues] = times[first_rows]
+        return first
+    
+    def window(self, start:int, end:int) -> np.ndarray:
+        """
+        Boolean mask of the events with start <= timestamp < end.
+        """
+        return (self.timestamp >= start) & (self.timestamp < end)
@@ -28,15 +28,21 @@ class ExampleAnalysis:
         Note: this is just an example analysis. You should replace the code here
         with your own implementation and then implement two more such analyses.
         """
-        issues:List[Issue] = DataLoader().get_issues()
-        
         ### BASIC STATISTICS
-        # Calculate the total number of events for a specific user (if specified in command line args)
-        total_events:int = 0
-        for issue in issues:
-            total_events += len([e for e in issue.events if self.USER is None or e.author == self.USER])
+        # Look up the issues with events by the user (if specified in command
+        # line args) in the index instead of scanning all issues, and take the
+        # number of issues per creator from the index as well
+        loader = DataLoader()
+        issues:List[Issue] = loader.get_issues()
+        index = loader.get_issue_index()
+        total_issues:int = len(issues)
+        if self.USER is not None:
+            total_events:int = sum(len([e for e in issue.events if e.author == self.USER])
+                                   for issue in index.by_event_author(self.USER))
+        else:
+            total_events:int = len(loader.get_event_table())
         
-        output:str = f'Found {total_events} events across {len(issues)} issues'
+        output:str = f'Found {total_events} events across {total_issues} issues'
         if self.USER is not None:
             output += f' for {self.USER}.'
         else:
@@ -47,10 +53,10 @@ class ExampleAnalysis:
         ### BAR CHART
         # Display a graph of the top 50 creators of issues
         top_n:int = 50
-        # Create a dataframe (with only the creator's name) to make statistics a lot easier
-        df = pd.DataFrame.from_records([{'creator':issue.creator} for issue in issues])
-        # Determine the number of issues for each creator and generate a bar chart of the top N
-        df_hist = df.groupby(df["creator"]).value_counts().nlargest(top_n).plot(kind="bar", figsize=(14,8), title=f"Top {top_n} issue creators")
+        # Create a series with the number of issues for each creator to make statistics a lot easier
+        creator_counts = pd.Series(index.creators(), name='count').rename_axis('creator')
+        # Generate a bar chart of the top N creators
+        df_hist = creator_counts.nlargest(top_n).plot(kind="bar", figsize=(14,8), title=f"Top {top_n} issue creators")
         # Set axes labels
         df_hist.set_xlabel("Creator Names")
         df_hist.set_ylabel("# of issues created")
@@ -0,0 +1,102 @@
+"""
+Classifies issues into general categories (Bug, Feature, Docs,
+Dependency, Infra, Other) from their labels and title, as used by
+feature 1 (see MostActiveCategoriesAnalyser).
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Categories in the order of priority when an issue has cues of several
+CATEGORIES:Tuple[str, ...] = ('Bug', 'Dependency', 'Infra', 'Feature', 'Docs')
+OTHER:str = 'Other'
+
+# Substrings of a (lowercased) label that mark an issue as a category
+_LABEL_SUBSTRINGS:Dict[str, List[str]] = {
+    'Bug': ['kind/bug', 'bug', 'crash', 'regression', 'panic', 'traceback', 'segfault', 'needs-reproduction'],
+    'Dependency': ['dependency', 'dependencies', 'deps', 'dependabot', 'bump', 'chore(deps)', 'security(deps)'],
+    'Infra': ['ci', 'cd', 'workflow', 'github actions', 'pipeline', 'build', 'release', 'refactor', 'tooling',
+              'flake8', 'ruff', 'test', 'tests', 'pytest', 'unittest'],
+    'Feature': ['kind/feature', 'kind/enhancement', 'feature', 'enhancement', 'improvement'],
+    'Docs': ['docs', 'documentation', 'readme', 'guide', 'tutorial', 'howto', 'how-to', 'faq', 'kind/question'],
+}
+
+# Label families (a label equal to the family or starting with '<family>/') that mark a category
+_LABEL_FAMILIES:Dict[str, List[str]] = {
+    'Infra': ['area/ci', 'area/cli', 'area/core', 'area/config', 'area/installer', 'area/solver'],
+    'Docs': ['area/docs', 'docs/faq'],
+}
+
+# Patterns searched for in the (lowercased) title
+_TITLE_PATTERNS:Dict[str, str] = {
+    'Bug': r'\bbug|crash|regression|error|fix(es)?\b',
+    'Dependency': r'\bdependenc(y|ies)|deps|dependabot|bump|poetry\.lock\b',
+    'Infra': r'\bci|cd|workflow|build|release|pipeline|test(s)?\b',
+    'Feature': r'\b(feature|enhancement|improvement|proposal|request)\b',
+    'Docs': r'\bdoc(s)?|readme|guide|tutorial|how[- ]?to|faq\b',
+}
+
+
+class IssueClassifier:
+    """
+    Maps the labels and title of an issue to a category. The patterns
+    are compiled once, the cues of each distinct label are computed once
+    (as a bit per category) and results are cached by labels and title,
+    so classifying many issues that share labels and titles is cheap.
+    """
+
+    def __init__(self, max_cache_size:int=1 << 20):
+        # All substrings of a category in one alternation per category
+        self._label_patterns:List[re.Pattern] = [
+            re.compile('|'.join(re.escape(substring) for substring in _LABEL_SUBSTRINGS[category]))
+            for category in CATEGORIES]
+        self._label_families:List[Tuple[str, ...]] = [
+            tuple(_LABEL_FAMILIES.get(category, [])) for category in CATEGORIES]
+        self._title_patterns:List[re.Pattern] = [re.compile(_TITLE_PATTERNS[category]) for category in CATEGORIES]
+        # Bit i is set if the label is a cue for CATEGORIES[i]
+        self._label_bits:Dict[str, int] = {}
+        self._cache:Dict[Tuple[Tuple[str, ...], str], str] = {}
+        self.max_cache_size:int = max_cache_size
+
+    def classify(self, labels:Optional[Iterable[str]], title:Optional[str]='') -> str:
+        """
+        Category of an issue. When cues of several categories are
+        present, the first in CATEGORIES wins.
+        """
+        key = (tuple(labels or ()), title or '')
+        category = self._cache.get(key)
+        if category is None:
+            category = self._classify(*key)
+            if len(self._cache) >= self.max_cache_size:
+                self._cache.clear()
+            self._cache[key] = category
+        return category
+
+    def classify_many(self, labels:Iterable[Optional[Iterable[str]]],
+                      titles:Iterable[Optional[str]]) -> List[str]:
+        """
+        Categories of many issues, given their labels and titles in the same order.
+        """
+        return [self.classify(issue_labels, title) for issue_labels, title in zip(labels, titles)]
+
+    def _classify(self, labels:Tuple[str, ...], title:str) -> str:
+        bits = 0
+        for label in labels:
+            bits |= self._bits(label)
+        title = title.lower()
+        for i, category in enumerate(CATEGORIES):
+            if bits >> i & 1 or self._title_patterns[i].search(title):
+                return category
+        return OTHER
+
+    def _bits(self, label:str) -> int:
+        bits = self._label_bits.get(label)
+        if bits is None:
+            name = str(label).lower()
+            bits = 0
+            for i, (pattern, families) in enumerate(zip(self._label_patterns, self._label_families)):
+                if pattern.search(name) or any(name == family or name.startswith(family + '/')
+                                               for family in families):
+                    bits |= 1 << i
+            self._label_bits[label] = bits
+        return bits
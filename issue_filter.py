@@ -0,0 +1,81 @@
+"""
+Filters on the creation date and state of issues that are applied while
+the issues are loaded (see DataLoader.get_issues()), so that issues that
+do not match are never built.
+"""
+
+from datetime import datetime
+from typing import FrozenSet, Iterable, Optional, Union
+
+from model import Issue, State, parse_timestamp
+
+
+class IssueFilter:
+    """
+    Selects the issues created in [created_after, created_before) that are
+    in one of the given states. Bounds and states that are None are not
+    checked. Naive datetimes are taken to be in local time, like the
+    result of datetime.now().
+    """
+
+    def __init__(self, created_after:datetime=None, created_before:datetime=None,
+                 state:Union[State, str, Iterable[Union[State, str]]]=None):
+        # Bounds as seconds since the epoch
+        self.created_after:Optional[float] = created_after.timestamp() if created_after is not None else None
+        self.created_before:Optional[float] = created_before.timestamp() if created_before is not None else None
+        # Values of the accepted states
+        self.states:Optional[FrozenSet[str]] = None
+        if state is not None:
+            if isinstance(state, str):
+                state = [state]
+            self.states = frozenset(State(value).value for value in state)
+
+    @property
+    def selects_all(self) -> bool:
+        return self.created_after is None and self.created_before is None and self.states is None
+
+    @property
+    def fields(self) -> FrozenSet[str]:
+        """
+        Fields of the issues (see Issue.FIELDS) that the filter checks.
+        """
+        return frozenset((['created_date'] if self.has_time_range else [])
+                         + (['state'] if self.states is not None else []))
+
+    @property
+    def has_time_range(self) -> bool:
+        return self.created_after is not None or self.created_before is not None
+
+    def matches(self, created:Optional[float], state:Optional[str]) -> bool:
+        """
+        Checks the creation time (seconds since the epoch) and the state
+        value of an issue. Issues without a creation time never match a
+        time range.
+        """
+        if self.states is not None and state not in self.states:
+            return False
+        if self.has_time_range:
+            if created is None:
+                return False
+            if self.created_after is not None and created < self.created_after:
+                return False
+            if self.created_before is not None and created >= self.created_before:
+                return False
+        return True
+
+    def matches_record(self, jobj:dict) -> bool:
+        """
+        Checks a raw issue record from the data file.
+        """
+        created = None
+        if self.has_time_range:
+            created_date = parse_timestamp(jobj.get('created_date'))
+            created = created_date.timestamp() if created_date is not None else None
+        return self.matches(created, jobj.get('state'))
+
+    def matches_issue(self, issue:Issue) -> bool:
+        """
+        Checks an issue that has already been loaded.
+        """
+        created = issue.created_date.timestamp() if issue.created_date is not None else None
+        return self.matches(created, issue.state.value if issue.state is not None else None)
@@ -0,0 +1,144 @@
+"""
+Secondary indexes over a loaded issue list, so that analyses can look
+up the issues with a given number, creator, label, state, assignee or
+event author without scanning all issues.
+"""
+
+from bisect import insort
+from typing import Dict, Iterator, List, Optional
+
+from label_index import label_names
+from model import Issue, State
+
+
+class IssueIndex:
+    """
+    Hash indexes from field values to the positions of the issues in the
+    issue list. Lookups return the issues in the order of the list.
+
+    The index of event authors needs all events, which are built lazily,
+    so it is only built when it is first used.
+    """
+
+    def __init__(self, issues:List[Issue]):
+        self.issues:List[Issue] = issues
+        self._by_number:Dict[int, int] = {}
+        self._by_creator:Dict[str, List[int]] = {}
+        self._by_label:Dict[str, List[int]] = {}
+        self._by_state:Dict[State, List[int]] = {}
+        self._by_assignee:Dict[str, List[int]] = {}
+        self._by_event_author:Optional[Dict[str, List[int]]] = None
+        for position, issue in enumerate(issues):
+            self._add(position, issue)
+
+    def get(self, number:int) -> Optional[Issue]:
+        """
+        The issue with the given number, or None.
+        """
+        position = self._by_number.get(number)
+        return self.issues[position] if position is not None else None
+
+    def position(self, number:int) -> Optional[int]:
+        """
+        Position of the issue with the given number in the issue list, or None.
+        """
+        return self._by_number.get(number)
+
+    def by_creator(self, creator:str) -> List[Issue]:
+        return self._lookup(self._by_creator, creator)
+
+    def by_label(self, label:str) -> List[Issue]:
+        return self._lookup(self._by_label, label)
+
+    def by_state(self, state:State) -> List[Issue]:
+        return self._lookup(self._by_state, State(state))
+
+    def by_assignee(self, assignee:str) -> List[Issue]:
+        return self._lookup(self._by_assignee, assignee)
+
+    def by_event_author(self, author:str) -> List[Issue]:
+        """
+        The issues with at least one event by the given author.
+        """
+        return self._lookup(self._event_authors(), author)
+
+    def creators(self) -> Dict[str, int]:
+        """
+        Number of issues created by each creator.
+        """
+        return {creator: len(positions) for creator, positions in self._by_creator.items()}
+
+    def labels(self) -> Dict[str, int]:
+        """
+        Number of issues with each label.
+        """
+        return {label: len(positions) for label, positions in self._by_label.items()}
+
+    def update(self, position:int, old:Optional[Issue]=None):
+        """
+        Re-indexes the issue at a position of the issue list after it was
+        replaced (old is the issue it replaced) or added (old is None),
+        e.g. by a delta.
+        """
+        if old is not None:
+            self._remove(position, old)
+        self._add(position, self.issues[position])
+
+    def _lookup(self, index:Dict[any, List[int]], key:any) -> List[Issue]:
+        return [self.issues[position] for position in index.get(key, [])]
+
+    def _add(self, position:int, issue:Issue):
+        if issue.number is not None:
+            self._by_number[issue.number] = position
+        for index, keys in self._keys(issue):
+            for key in keys:
+                insort(index.setdefault(key, []), position)
+        if self._by_event_author is not None:
+            for author in _event_authors(issue):
+                insort(self._by_event_author.setdefault(author, []), position)
+
+    def _remove(self, position:int, issue:Issue):
+        if self._by_number.get(issue.number) == position:
+            del self._by_number[issue.number]
+        indexes = list(self._keys(issue))
+        if self._by_event_author is not None:
+            indexes.append((self._by_event_author, _event_authors(issue)))
+        for index, keys in indexes:
+            for key in keys:
+                positions = index.get(key, [])
+                if position in positions:
+                    positions.remove(position)
+                if not positions:
+                    index.pop(key, None)
+
+    def _keys(self, issue:Issue) -> Iterator[tuple]:
+        yield self._by_creator, _user_names([issue.creator])
+        yield self._by_label, set(label_names(issue.labels))
+        yield self._by_state, {issue.state} - {None}
+        yield self._by_assignee, _user_names(issue.assignees)
+
+    def _event_authors(self) -> Dict[str, List[int]]:
+        if self._by_event_author is None:
+            self._by_event_author = {}
+            for position, issue in enumerate(self.issues):
+                for author in _event_authors(issue):
+                    self._by_event_author.setdefault(author, []).append(position)
+        return self._by_event_author
+
+
+def _user_names(users:list) -> set:
+    """
+    Distinct logins of users, which are mostly strings but can also be
+    GitHub user objects.
+    """
+    names = set()
+    for user in users:
+        if isinstance(user, dict):
+            user = user.get('login')
+        if isinstance(user, str):
+            names.add(user)
+    return names
+
+
+def _event_authors(issue:Issue) -> set:
+    return _user_names([event.author for event in issue.events])
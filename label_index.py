@@ -0,0 +1,209 @@
+"""
+Inverted index from labels (and label families such as area/* and
+kind/*) to bitmaps of the issues that have them, so that label
+predicates are answered with set algebra on bitmaps instead of scanning
+the labels of every issue.
+"""
+
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from model import Issue
+
+
+class Bitmap:
+    """
+    Set of issue positions, stored as the bits of a Python int (bit i set
+    if the issue at position i is in the set). size is the number of issues
+    in the list, which bounds the complement. Combine bitmaps with
+    & (and), | (or), - (and not) and ~ (not).
+    """
+
+    __slots__ = ('bits', 'size')
+
+    def __init__(self, bits:int=0, size:int=0):
+        self.bits:int = bits
+        self.size:int = size
+
+    @classmethod
+    def from_positions(cls, positions:Iterable[int], size:int) -> 'Bitmap':
+        return cls(_bits(positions, size), size)
+
+    @classmethod
+    def full(cls, size:int) -> 'Bitmap':
+        return cls((1 << size) - 1, size)
+
+    def positions(self) -> np.ndarray:
+        """
+        Positions in the set, in ascending order.
+        """
+        if not self.bits:
+            return np.zeros(0, dtype=np.int64)
+        data = np.frombuffer(self.bits.to_bytes((self.bits.bit_length() + 7) // 8, 'little'), dtype=np.uint8)
+        return np.flatnonzero(np.unpackbits(data, bitorder='little'))
+
+    def select(self, items:List[any]) -> List[any]:
+        """
+        The items of a list (e.g. the issue list) at the positions in the set.
+        """
+        return [items[position] for position in self.positions().tolist()]
+
+    def __and__(self, other:'Bitmap') -> 'Bitmap':
+        return Bitmap(self.bits & other.bits, max(self.size, other.size))
+
+    def __or__(self, other:'Bitmap') -> 'Bitmap':
+        return Bitmap(self.bits | other.bits, max(self.size, other.size))
+
+    def __sub__(self, other:'Bitmap') -> 'Bitmap':
+        return Bitmap(self.bits & ~other.bits, max(self.size, other.size))
+
+    def __invert__(self) -> 'Bitmap':
+        return Bitmap(((1 << self.size) - 1) & ~self.bits, self.size)
+
+    def __contains__(self, position:int) -> bool:
+        return bool(self.bits >> position & 1)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.positions().tolist())
+
+    def __len__(self) -> int:
+        return self.bits.bit_count()
+
+    def __bool__(self) -> bool:
+        return self.bits != 0
+
+    def __eq__(self, other:object) -> bool:
+        return isinstance(other, Bitmap) and self.bits == other.bits
+
+    def __hash__(self) -> int:
+        return hash(self.bits)
+
+    def __repr__(self) -> str:
+        return f'Bitmap({len(self)} of {self.size})'
+
+
+class LabelIndex:
+    """
+    Bitmap of the issues with each label and with any label of each
+    family. The family of a label is the part before the first '/'
+    (lowercased), e.g. 'area' for 'area/cli'.
+    """
+
+    def __init__(self, labels:List[List[str]]):
+        """
+        Constructor. labels holds the label names of each issue, in the
+        order of the issue list.
+        """
+        self.size:int = len(labels)
+        label_positions:Dict[str, List[int]] = {}
+        family_positions:Dict[str, List[int]] = {}
+        for position, names in enumerate(labels):
+            for name in names:
+                label_positions.setdefault(name, []).append(position)
+                family = _family(name)
+                if family is not None:
+                    family_positions.setdefault(family, []).append(position)
+        self._labels:Dict[str, int] = {name: _bits(positions, self.size)
+                                       for name, positions in label_positions.items()}
+        self._families:Dict[str, int] = {family: _bits(positions, self.size)
+                                         for family, positions in family_positions.items()}
+
+    @classmethod
+    def from_issues(cls, issues:List[Issue]) -> 'LabelIndex':
+        return cls([label_names(issue.labels) for issue in issues])
+
+    def label(self, name:str) -> Bitmap:
+        """
+        Issues with a label, or with any label of a family if the name
+        has the form 'family/*'.
+        """
+        if name.endswith('/*'):
+            return self.family(name[:-2])
+        return Bitmap(self._labels.get(name, 0), self.size)
+
+    def family(self, family:str) -> Bitmap:
+        """
+        Issues with any label of a family (e.g. 'area').
+        """
+        return Bitmap(self._families.get(family.lower(), 0), self.size)
+
+    def any_of(self, names:Iterable[str]) -> Bitmap:
+        bits = 0
+        for name in names:
+            bits |= self.label(name).bits
+        return Bitmap(bits, self.size)
+
+    def all_of(self, names:Iterable[str]) -> Bitmap:
+        result = self.all()
+        for name in names:
+            result &= self.label(name)
+        return result
+
+    def containing(self, substring:str) -> Bitmap:
+        """
+        Issues with a label that contains a substring (case-insensitive).
+        Only the distinct labels are searched.
+        """
+        substring = substring.lower()
+        return self.any_of(name for name in self._labels if substring in name.lower())
+
+    def all(self) -> Bitmap:
+        return Bitmap.full(self.size)
+
+    def labels(self) -> List[str]:
+        return list(self._labels)
+
+    def labels_in_family(self, family:str) -> List[str]:
+        return [name for name in self._labels if _family(name) == family.lower()]
+
+    def counts(self, within:Bitmap=None) -> Dict[str, int]:
+        """
+        Number of issues (optionally only of those in a bitmap) with each label.
+        """
+        return {name: (bits & within.bits if within is not None else bits).bit_count()
+                for name, bits in self._labels.items()}
+
+    def update(self, position:int, old_labels:List[str], new_labels:List[str]):
+        """
+        Updates the labels of the issue at a position after it was replaced
+        (old_labels empty if it was added), e.g. by a delta.
+        """
+        bit = 1 << position
+        for name in old_labels:
+            for index, key in ((self._labels, name), (self._families, _family(name))):
+                if key in index:
+                    index[key] &= ~bit
+                    if not index[key]:
+                        del index[key]
+        for name in new_labels:
+            self._labels[name] = self._labels.get(name, 0) | bit
+            family = _family(name)
+            if family is not None:
+                self._families[family] = self._families.get(family, 0) | bit
+        self.size = max(self.size, position + 1)
+
+
+def label_names(labels:list) -> List[str]:
+    """
+    Names of labels, which are mostly strings but can also be GitHub
+    label objects.
+    """
+    names = []
+    for label in labels or []:
+        if isinstance(label, dict):
+            label = label.get('name')
+        if isinstance(label, str):
+            names.append(label)
+    return names
+
+
+def _family(name:str) -> Optional[str]:
+    return name.split('/', 1)[0].lower() if '/' in name else None
+
+
+def _bits(positions:Iterable[int], size:int) -> int:
+    # Sets the bits of all positions at once instead of one (big int) operation each
+    flags = np.zeros(size, dtype=bool)
+    flags[np.fromiter(positions, dtype=np.int64)] = True
+    return int.from_bytes(np.packbits(flags, bitorder='little').tobytes(), 'little')
@@ -0,0 +1,245 @@
+"""
+Reports how much memory the loaded issues take up, broken down by the
+kind of object holding it, and how much was allocated in each phase of
+loading them (see DataLoader.get_memory_report()).
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from enum import Enum
+from functools import partial
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+from tabulate import tabulate
+
+from model import Issue, Event
+from text_heap import TextRef
+
+
+# Attributes (and raw record fields) that hold titles, bodies and comments
+_TEXT_FIELDS:FrozenSet[str] = frozenset(('title', 'text', 'comment', '_title', '_text', '_comment'))
+
+
+def measure(issues:Iterable[Issue], extra:Dict[str, int]=None) -> Dict[str, int]:
+    """
+    Sums the sizes (in bytes) of the objects reachable from the issues.
+    Objects shared between issues (e.g. interned strings) are counted once.
+    Titles, bodies and comments are counted as texts, separately from the
+    other strings. Texts in a memory-mapped heap only take up a handle on
+    the Python heap; their encoded size is reported as 'texts (mapped)' and
+    not included in the total. extra holds the sizes of other objects kept
+    with the issues (e.g. the event table), which are included in the total.
+    """
+    sizes:Dict[str, int] = {'issues': 0, 'events': 0, 'lists': 0, 'strings': 0, 'texts': 0, 'dates': 0,
+                            'text handles': 0, 'raw records': 0, 'other': 0}
+    mapped = 0
+    seen = set()
+
+    def add(category:str, obj:any):
+        if obj is None or id(obj) in seen:
+            return
+        seen.add(id(obj))
+        sizes[category] += sys.getsizeof(obj)
+
+    def add_value(obj:any, is_text:bool=False):
+        nonlocal mapped
+        if isinstance(obj, str):
+            add('texts' if is_text else 'strings', obj)
+        elif isinstance(obj, datetime):
+            add('dates', obj)
+        elif isinstance(obj, TextRef):
+            if id(obj) not in seen:
+                mapped += obj.length
+            add('text handles', obj)
+        elif isinstance(obj, list):
+            add('lists', obj)
+            for item in obj:
+                add_value(item)
+        elif isinstance(obj, dict):
+            # Raw records retained for building the events on first access
+            add('raw records', obj)
+            for name, item in obj.items():
+                add_value(item, name in _TEXT_FIELDS)
+        elif isinstance(obj, (tuple, partial)):
+            add('raw records', obj)
+            for item in obj.args if isinstance(obj, partial) else obj:
+                add_value(item)
+        elif obj is not None and not isinstance(obj, (bool, Enum)):
+            add('other', obj)
+
+    for issue in issues:
+        add('issues', issue)
+        add('issues', getattr(issue, '__dict__', None))
+        for name, value in _attributes(issue):
+            if isinstance(value, list) and value and isinstance(value[0], Event):
+                add('lists', value)
+                for event in value:
+                    add('events', event)
+                    add('events', getattr(event, '__dict__', None))
+                    for event_name, event_value in _attributes(event):
+                        add_value(event_value, event_name in _TEXT_FIELDS)
+            else:
+                add_value(value, name in _TEXT_FIELDS)
+
+    sizes.update(extra or {})
+    sizes['total'] = sum(sizes.values())
+    sizes['texts (mapped)'] = mapped
+    return sizes
+
+
+def estimate(issues:List[Issue], sample_size:int=256) -> int:
+    """
+    Estimates the total size (in bytes) of the issues from a sample of
+    evenly spaced issues, which is much faster than measuring all of them.
+    """
+    if len(issues) <= sample_size:
+        return measure(issues)['total']
+    step = len(issues) / sample_size
+    sample = [issues[int(n * step)] for n in range(sample_size)]
+    return int(measure(sample)['total'] * len(issues) / sample_size)
+
+
+def _attributes(obj:any) -> List[Tuple[str, any]]:
+    if hasattr(obj, '__dict__'):
+        return list(vars(obj).items())
+    # Read the slots directly so that lazily built attributes are not materialised
+    return [(name, getattr(obj, name, None)) for name in type(obj).__slots__]
+
+
+class LoadProfile:
+    """
+    Memory allocated (as traced by tracemalloc) and time taken by each
+    phase of a load, the peak resident set size of the process during the
+    load and the sizes of the loaded objects (see measure()).
+    """
+
+    def __init__(self, top_sites:int=10):
+        # Phase name -> (seconds, bytes still allocated at the end, peak bytes allocated)
+        self.phases:Dict[str, Tuple[float, int, int]] = {}
+        self.rss_before:Optional[int] = None
+        self.peak_rss:Optional[int] = None
+        self.rss_after:Optional[int] = None
+        self.sizes:Dict[str, int] = {}
+        # Source lines that allocated the most memory still held after the load
+        self.top_sites:List[Tuple[str, int]] = []
+        self._num_top_sites:int = top_sites
+        self._phase:Optional[str] = None
+
+    @contextmanager
+    def tracking(self) -> Iterator['LoadProfile']:
+        """
+        Traces allocations and the resident set size while the block runs.
+        """
+        started = not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        _reset_peak_rss()
+        self.rss_before = _current_rss()
+        try:
+            yield self
+        finally:
+            self.peak_rss = _peak_rss()
+            self.rss_after = _current_rss()
+            stats = tracemalloc.take_snapshot().statistics('lineno')[:self._num_top_sites]
+            self.top_sites = [(str(stat.traceback), stat.size) for stat in stats]
+            if started:
+                tracemalloc.stop()
+
+    @contextmanager
+    def phase(self, name:str) -> Iterator[None]:
+        """
+        Records the allocations of a phase. Phases nested in another phase
+        are counted as part of the outer phase.
+        """
+        if self._phase is not None or not tracemalloc.is_tracing():
+            yield
+            return
+        self._phase = name
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            current, peak = tracemalloc.get_traced_memory()
+            seconds, allocated, peak_allocated = self.phases.get(name, (0.0, 0, 0))
+            self.phases[name] = (seconds + time.perf_counter() - start, allocated + current - before,
+                                 max(peak_allocated, peak - before))
+            self._phase = None
+
+
+def print_report(sizes:Dict[str, int]):
+    """
+    Prints the sizes returned by measure() as a table.
+    """
+    rows = [[category, f'{size / (1 << 20):.1f}'] for category, size in sizes.items()]
+    print(tabulate(rows, headers=['Category', 'MB'], tablefmt='github'))
+
+
+def print_load_profile(profile:LoadProfile):
+    """
+    Prints a LoadProfile as tables.
+    """
+    print_report(profile.sizes)
+    print()
+    rows = [[name, f'{seconds:.2f}', f'{allocated / (1 << 20):.1f}', f'{peak / (1 << 20):.1f}']
+            for name, (seconds, allocated, peak) in profile.phases.items()]
+    print(tabulate(rows, headers=['Phase', 'Seconds', 'Held MB', 'Peak MB'], tablefmt='github'))
+    print()
+    rows = [[name, f'{size / (1 << 20):.1f}' if size is not None else 'n/a'] for name, size in (
+        ('before load', profile.rss_before), ('peak during load', profile.peak_rss),
+        ('after load', profile.rss_after))]
+    print(tabulate(rows, headers=['Resident set size', 'MB'], tablefmt='github'))
+    print()
+    rows = [[site, f'{size / (1 << 20):.1f}'] for site, size in profile.top_sites]
+    print(tabulate(rows, headers=['Allocated at', 'MB'], tablefmt='github'))
+
+
+def _proc_status(field:str) -> Optional[int]:
+    # Memory field of /proc/self/status (Linux) in bytes
+    try:
+        with open('/proc/self/status', 'r') as fin:
+            for line in fin:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _current_rss() -> Optional[int]:
+    return _proc_status('VmRSS')
+
+
+def _peak_rss() -> Optional[int]:
+    peak = _proc_status('VmHWM')
+    if peak is None and resource is not None:
+        # Peak of the whole process; ru_maxrss is in bytes on macOS and in KB elsewhere
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak *= 1 if sys.platform == 'darwin' else 1024
+    return peak
+
+
+def _reset_peak_rss():
+    # Resets the peak (VmHWM) to the current resident set size, so that the
+    # peak measured afterwards is the peak during the load (Linux only)
+    try:
+        with open(f'/proc/{os.getpid()}/clear_refs', 'w') as fout:
+            fout.write('5')
+    except OSError:
+        pass
+
+
+if __name__ == '__main__':
+    from data_loader import DataLoader
+    print_load_profile(DataLoader().get_memory_report())
@@ -3,11 +3,59 @@ Implements a runtime data model that can be used to access
 the properties contained in the issues JSON.
 """
 
-from typing import List, Dict, Set, Tuple
+from typing import List, Dict, Set, Tuple, Optional, Callable, AbstractSet, FrozenSet
 from enum import Enum
 from datetime import datetime
+from functools import lru_cache, partial
 from dateutil import parser
 
+import text_heap
+from symbols import EVENT_TYPES, USERS, LABELS, NO_CODE, SymbolTable
+
+
+# Number of timestamps that did not have the format used by the data
+# file and had to be parsed with dateutil instead
+timestamp_fallbacks:int = 0
+
+
+def parse_timestamp(value:any) -> Optional[datetime]:
+    """
+    Parses a timestamp from the data file. All timestamps in the dump have
+    the fixed format YYYY-MM-DDTHH:MM:SS+00:00, which is decoded directly.
+    Anything else is handed to the (much slower) dateutil parser.
+    Returns None for missing or unparseable values.
+    """
+    global timestamp_fallbacks
+    if not value or not isinstance(value, str):
+        return None
+    if len(value) == 25 and value[10] == 'T' and value.endswith('+00:00'):
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    timestamp_fallbacks += 1
+    return _parse_timestamp_fallback(value)
+
+
+@lru_cache(maxsize=4096)
+def _parse_timestamp_fallback(value:str) -> Optional[datetime]:
+    try:
+        return parser.parse(value)
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+
+def _symbol(table:SymbolTable, value:any) -> Tuple[any, int]:
+    """
+    Shared instance and code of a value in a symbol table. Values that
+    are not strings (e.g. GitHub user objects) are kept as they are and
+    have no code, as in the labels and assignees of an issue.
+    """
+    if isinstance(value, str):
+        code = table.code(value)
+        return table.name(code), code
+    return value, NO_CODE
+
 
 class State(str, Enum):
     """
@@ -19,7 +67,14 @@ class State(str, Enum):
 
 class Event:
     
-    def __init__(self, jobj:any):
+    # Slots instead of a per-instance __dict__ keep the ~75k events compact
+    __slots__ = ('_event_type', '_event_type_code', '_author', '_author_code',
+                 'event_date', '_label', '_label_code', '_comment')
+    
+    # Fields that can be selected when loading events
+    FIELDS:FrozenSet[str] = frozenset(('event_type', 'author', 'event_date', 'label', 'comment'))
+    
+    def __init__(self, jobj:any, fields:AbstractSet[str]=None):
         self.event_type:str = None
         self.author:str = None
         self.event_date:datetime = None
@@ -27,22 +82,95 @@ class Event:
         self.comment:str = None
         
         if jobj is not None:
-            self.from_json(jobj)
+            self.from_json(jobj, fields)
     
-    def from_json(self, jobj:any):
-        self.event_type = jobj.get('event_type')
-        self.author = jobj.get('author')
-        try:
-            self.event_date = parser.parse(jobj.get('event_date'))
-        except:
-            pass
-        self.label = jobj.get('label')
-        self.comment = jobj.get('comment')
+    def from_json(self, jobj:any, fields:AbstractSet[str]=None):
+        """
+        Sets the fields from a raw event record. If fields is given, only
+        those fields are decoded and the others keep their defaults.
+        """
+        if fields is None:
+            fields = Event.FIELDS
+        if 'event_type' in fields:
+            self.event_type = jobj.get('event_type')
+        if 'author' in fields:
+            self.author = jobj.get('author')
+        if 'event_date' in fields:
+            self.event_date = parse_timestamp(jobj.get('event_date'))
+        if 'label' in fields:
+            self.label = jobj.get('label')
+        if 'comment' in fields:
+            self.comment = jobj.get('comment')
+    
+    # Event type, author and label are interned in the shared symbol tables
+    # (see symbols) and their integer codes are kept alongside
+    @property
+    def event_type(self) -> str:
+        return self._event_type
+    
+    @event_type.setter
+    def event_type(self, event_type:str):
+        self._event_type, self._event_type_code = _symbol(EVENT_TYPES, event_type)
+    
+    @property
+    def event_type_code(self) -> int:
+        return self._event_type_code
+    
+    @property
+    def author(self) -> str:
+        return self._author
+    
+    @author.setter
+    def author(self, author:str):
+        self._author, self._author_code = _symbol(USERS, author)
+    
+    @property
+    def author_code(self) -> int:
+        return self._author_code
+    
+    @property
+    def label(self) -> str:
+        return self._label
+    
+    @label.setter
+    def label(self, label:str):
+        self._label, self._label_code = _symbol(LABELS, label)
+    
+    @property
+    def label_code(self) -> int:
+        return self._label_code
+    
+    @property
+    def comment(self) -> str:
+        # May be stored off-heap by the loader (see text_heap)
+        return text_heap.resolve(self._comment)
+    
+    @comment.setter
+    def comment(self, comment:any):
+        self._comment = comment
+    
+    # Symbol codes are only valid within one process, so they are not
+    # pickled but recomputed when the event is unpickled
+    def __getstate__(self) -> dict:
+        return {'event_type': self._event_type, 'author': self._author, 'event_date': self.event_date,
+                'label': self._label, 'comment': self._comment}
+    
+    def __setstate__(self, state:dict):
+        for name, value in state.items():
+            setattr(self, name, value)
         
         
 class Issue:
     
-    def __init__(self, jobj:any=None):
+    __slots__ = ('url', '_creator', '_creator_code', '_labels', 'state', '_assignees', '_title', '_text',
+                 'number', 'created_date', 'updated_date', 'timeline_url',
+                 '_events', '_event_loader')
+    
+    # Fields that can be selected when loading issues
+    FIELDS:FrozenSet[str] = frozenset(('url', 'creator', 'labels', 'state', 'assignees', 'title', 'text',
+                                       'number', 'created_date', 'updated_date', 'timeline_url', 'events'))
+    
+    def __init__(self, jobj:any=None, fields:AbstractSet[str]=None, event_fields:AbstractSet[str]=None):
         self.url:str = None
         self.creator:str = None
         self.labels:List[str] = []
@@ -54,30 +182,153 @@ class Issue:
         self.created_date:datetime = None
         self.updated_date:datetime = None
         self.timeline_url:str = None
-        self.events:List[Event] = []
+        self._events:List[Event] = []
+        # Builds the events from the raw records the first time they are accessed
+        self._event_loader:Callable[[], List[Event]] = None
         
         if jobj is not None:
-            self.from_json(jobj)
-    
-    def from_json(self, jobj:any):
-        self.url = jobj.get('url')
-        self.creator = jobj.get('creator')
-        self.labels = jobj.get('labels',[])
-        self.state = State[jobj.get('state')]
-        self.assignees = jobj.get('assignees',[])
-        self.title = jobj.get('title')
-        self.text = jobj.get('text')
-        try:
-            self.number = int(jobj.get('number','-1'))
-        except:
-            pass
-        try:
-            self.created_date = parser.parse(jobj.get('created_date'))
-        except:
-            pass
-        try:
-            self.updated_date = parser.parse(jobj.get('updated_date'))
-        except:
-            pass
-        self.timeline_url = jobj.get('timeline_url')
-        self.events = [Event(jevent) for jevent in jobj.get('events',[])]
\ No newline at end of file
+            self.from_json(jobj, fields, event_fields)
+    
+    def from_json(self, jobj:any, fields:AbstractSet[str]=None, event_fields:AbstractSet[str]=None):
+        """
+        Sets the fields from a raw issue record. If fields (or event_fields)
+        is given, only those fields of the issue (or its events) are decoded
+        and the others keep their defaults.
+        """
+        if fields is None:
+            fields = Issue.FIELDS
+        if 'url' in fields:
+            self.url = jobj.get('url')
+        if 'creator' in fields:
+            self.creator = jobj.get('creator')
+        if 'labels' in fields:
+            self.labels = jobj.get('labels',[])
+        if 'state' in fields:
+            self.state = State[jobj.get('state')]
+        if 'assignees' in fields:
+            self.assignees = jobj.get('assignees',[])
+        if 'title' in fields:
+            self.title = jobj.get('title')
+        if 'text' in fields:
+            self.text = jobj.get('text')
+        if 'number' in fields:
+            try:
+                self.number = int(jobj.get('number','-1'))
+            except (TypeError, ValueError):
+                pass
+        if 'created_date' in fields:
+            self.created_date = parse_timestamp(jobj.get('created_date'))
+        if 'updated_date' in fields:
+            self.updated_date = parse_timestamp(jobj.get('updated_date'))
+        if 'timeline_url' in fields:
+            self.timeline_url = jobj.get('timeline_url')
+        if 'events' in fields:
+            self.set_event_loader(partial(_events_from_json, jobj.get('events',[]), event_fields))
+    
+    # Creator, labels and assignees are interned in the shared symbol
+    # tables (see symbols) so that their codes can be looked up cheaply
+    @property
+    def creator(self) -> str:
+        return self._creator
+    
+    @creator.setter
+    def creator(self, creator:str):
+        self._creator, self._creator_code = _symbol(USERS, creator)
+    
+    @property
+    def creator_code(self) -> int:
+        return self._creator_code
+    
+    @property
+    def labels(self) -> List[str]:
+        return self._labels
+    
+    @labels.setter
+    def labels(self, labels:List[str]):
+        self._labels = [LABELS.intern(label) if isinstance(label, str) else label for label in labels]
+    
+    @property
+    def label_codes(self) -> List[int]:
+        return [LABELS.code(label) if isinstance(label, str) else NO_CODE for label in self._labels]
+    
+    @property
+    def assignees(self) -> List[str]:
+        return self._assignees
+    
+    @assignees.setter
+    def assignees(self, assignees:List[str]):
+        self._assignees = [USERS.intern(assignee) if isinstance(assignee, str) else assignee
+                           for assignee in assignees]
+    
+    @property
+    def assignee_codes(self) -> List[int]:
+        return [USERS.code(assignee) if isinstance(assignee, str) else NO_CODE for assignee in self._assignees]
+    
+    @property
+    def title(self) -> str:
+        # Title and text may be stored off-heap by the loader (see text_heap)
+        return text_heap.resolve(self._title)
+    
+    @title.setter
+    def title(self, title:any):
+        self._title = title
+    
+    @property
+    def text(self) -> str:
+        return text_heap.resolve(self._text)
+    
+    @text.setter
+    def text(self, text:any):
+        self._text = text
+    
+    @property
+    def events(self) -> List[Event]:
+        """
+        Events of the issue. They are only constructed the first time
+        they are accessed so that analyses that never look at the events
+        do not pay for them.
+        """
+        if self._events is None:
+            self._events = self.build_events()
+            self._event_loader = None
+        return self._events
+    
+    @events.setter
+    def events(self, events:List[Event]):
+        self._events = events
+        self._event_loader = None
+    
+    # Symbol codes are only valid within one process, so they are not
+    # pickled but recomputed when the issue is unpickled
+    def __getstate__(self) -> dict:
+        return {'url': self.url, 'creator': self._creator, 'labels': self._labels, 'state': self.state,
+                'assignees': self._assignees, 'title': self._title, 'text': self._text,
+                'number': self.number, 'created_date': self.created_date,
+                'updated_date': self.updated_date, 'timeline_url': self.timeline_url,
+                '_events': self._events, '_event_loader': self._event_loader}
+    
+    def __setstate__(self, state:dict):
+        for name, value in state.items():
+            setattr(self, name, value)
+    
+    def set_event_loader(self, loader:Callable[[], List[Event]]):
+        """
+        Defers the construction of the events until they are first accessed.
+        """
+        self._events = None
+        self._event_loader = loader
+    
+    def build_events(self) -> List[Event]:
+        """
+        Returns the events without keeping them on the issue if they
+        have not been accessed yet.
+        """
+        if self._events is not None:
+            return self._events
+        if self._event_loader is None:
+            return []
+        return self._event_loader()
+
+
+def _events_from_json(jevents:List[any], fields:AbstractSet[str]=None) -> List[Event]:
+    return [Event(jevent, fields) for jevent in jevents]
\ No newline at end of file
@@ -1,16 +1,19 @@
 # most_active_categories_analyser.py
-import json
-from pathlib import Path
 from textwrap import fill
-from typing import Iterable, List, Dict, Optional
-import re
+from typing import List, Optional
 
-from dateutil import parser
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from tabulate import tabulate
 
+from data_loader import DataLoader
+from event_table import EventTable
+from issue_classifier import IssueClassifier
+from label_index import Bitmap, label_names
+from model import Issue
+from symbols import EVENT_TYPES
+
 
 class MostActiveCategoriesAnalyser:
     """
@@ -34,58 +37,55 @@ class MostActiveCategoriesAnalyser:
         "Other": "#7f7f7f"         # gray
     }
     CATEGORY_ORDER = ["Bug", "Feature", "Docs", "Dependency", "Infra", "Other"]
+    # Year of events without a date in the events frame
+    NO_YEAR = -1
 
-    def __init__(self, data_path: str = "./poetry_issues.json"):
-        self.data_path = Path(data_path)
+    def __init__(self, data_path: Optional[str] = None):
+        """
+        :param data_path: Data file to analyse. Defaults to the ENPM611_PROJECT_DATA_PATH setting.
+        """
+        # The issues (and their parsed dates) are shared with the other features through the DataLoader cache
+        self.loader = DataLoader(data_path)
+        self.classifier = IssueClassifier()
 
     # --------- Helpers ---------
-    def _load_issues(self) -> list:
-        return json.loads(self.data_path.read_text(encoding="utf-8"))
+    def _load_issues(self) -> List[Issue]:
+        return self.loader.get_issues()
 
     @staticmethod
-    def _iid(issue) -> str:
-        return str(issue.get("number") or issue.get("url", "").split("/")[-1])
+    def _iid(issue: Issue) -> str:
+        return str(issue.number or (issue.url or "").split("/")[-1])
 
-    @staticmethod
-    def _label_names(labels: Iterable) -> List[str]:
-        """Convert labels to a list of plain strings (handles dicts from the GitHub API)."""
-        out = []
-        for l in labels or []:
-            if isinstance(l, dict):
-                name = l.get("name")
-                if name:
-                    out.append(str(name))
-            else:
-                out.append(str(l))
-        return out
+    def _flatten_events(self, events: EventTable) -> pd.DataFrame:
+        """
+        Build a long dataframe of events from the columns of the event table:
+          issue (int32 position in the issue list), event_type (categorical),
+          event_date (datetime64, UTC), year (int16, NO_YEAR if undated)
+        Issue ids, titles and labels are looked up by position when needed
+        instead of being repeated on every event row.
+        """
+        event_types = [EVENT_TYPES.name(code) for code in range(len(EVENT_TYPES))]
+        # NO_TIMESTAMP is the smallest int64, which numpy reads as NaT
+        dates = events.timestamp.view("datetime64[s]")
+        years = dates.astype("datetime64[Y]").astype(np.int64) + 1970
+        years[np.isnat(dates)] = self.NO_YEAR
+        return pd.DataFrame({
+            "issue": events.issue,
+            "event_type": pd.Categorical.from_codes(events.event_type, categories=event_types),
+            "event_date": dates,
+            "year": years.astype(np.int16),
+        })
 
-    def _flatten_events(self, issues: list) -> pd.DataFrame:
+    @staticmethod
+    def _events_in_years(ev: pd.DataFrame, start_year: int, end_year: int) -> pd.DataFrame:
         """
-        Build a long dataframe of events:
-          issue_id, title, labels(list[str]), event_type, event_date, year
+        Events from start_year to end_year (inclusive), found by binary search.
+        ev must be sorted by year.
         """
-        rows = []
-        for iss in issues:
-            iid = self._iid(iss)
-            title = iss.get("title", "") or ""
-            labels = self._label_names(iss.get("labels", []) or [])
-            for ev in iss.get("events", []) or []:
-                etype = ev.get("event_type") or ev.get("type") or ev.get("event")
-                edate = ev.get("event_date") or ev.get("created_at") or ev.get("date")
-                try:
-                    dt = parser.parse(edate) if edate else None
-                    year = dt.year if dt else None
-                except Exception:
-                    dt, year = None, None
-                rows.append({
-                    "issue_id": iid,
-                    "title": title,
-                    "labels": tuple(labels),
-                    "event_type": etype,
-                    "event_date": dt,
-                    "year": year
-                })
-        return pd.DataFrame.from_records(rows)
+        years = ev["year"].to_numpy(dtype=float)
+        lo = np.searchsorted(years, start_year, side="left")
+        hi = np.searchsorted(years, end_year, side="right")
+        return ev.iloc[lo:hi].copy()
 
     def _make_ylabels(self, df: pd.DataFrame, wrap_at: int = 60) -> list[str]:
         """Wrap long titles for y-axis labels: '#<id>: <title>'."""
@@ -95,73 +95,12 @@ class MostActiveCategoriesAnalyser:
     # ---------- Classification (refined to shrink "Other") ----------
     def _classify_type(self, labels: List[str], title: str = "") -> str:
         """
-        Map labels/title to a general category.
-        Goal: reduce "Other" by capturing common families explicitly.
+        Map labels/title to a general category (see IssueClassifier).
 
         Priority order when multiple cues appear:
           Bug > Dependency > Infra > Feature > Docs > Other
         """
-        ll = [str(l).lower() for l in (labels or [])]
-        labset = set(ll)
-        t = (title or "").lower()
-
-        def has_any(substrs: List[str]) -> bool:
-            if not labset:
-                return False
-            return any(any(s in lab for s in substrs) for lab in labset)
-
-        def family_starts(prefix: str) -> bool:
-            p = prefix.lower()
-            if not labset:
-                return False
-            return any(lab.startswith(p + "/") or lab == p for lab in labset)
-
-        # 1) BUG
-        if (
-            has_any(["kind/bug", "bug", "crash", "regression", "panic", "traceback", "segfault", "needs-reproduction"])
-            or re.search(r"\bbug|crash|regression|error|fix(es)?\b", t)
-        ):
-            return "Bug"
-
-        # 2) DEPENDENCY
-        if (
-            has_any(["dependency", "dependencies", "deps", "dependabot", "bump", "chore(deps)", "security(deps)"])
-            or re.search(r"\bdependenc(y|ies)|deps|dependabot|bump|poetry\.lock\b", t)
-        ):
-            return "Dependency"
-
-        # 3) INFRA (tooling/CI/build/CLI/core/config/installer/solver/refactor/tests)
-        if (
-            has_any(["ci", "cd", "workflow", "github actions", "pipeline", "build", "release", "refactor", "tooling", "flake8", "ruff"])
-            or family_starts("area/ci")
-            or family_starts("area/cli")
-            or family_starts("area/core")
-            or family_starts("area/config")
-            or family_starts("area/installer")
-            or family_starts("area/solver")
-            or has_any(["test", "tests", "pytest", "unittest"])
-            or re.search(r"\bci|cd|workflow|build|release|pipeline|test(s)?\b", t)
-        ):
-            return "Infra"
-
-        # 4) FEATURE (enhancement/requests)
-        if (
-            has_any(["kind/feature", "kind/enhancement", "feature", "enhancement", "improvement"])
-            or re.search(r"\b(feature|enhancement|improvement|proposal|request)\b", t)
-        ):
-            return "Feature"
-
-        # 5) DOCS (include questions/FAQ/how-to)
-        if (
-            has_any(["docs", "documentation", "readme", "guide", "tutorial", "howto", "how-to", "faq", "kind/question"])
-            or family_starts("area/docs")
-            or family_starts("docs/faq")
-            or re.search(r"\bdoc(s)?|readme|guide|tutorial|how[- ]?to|faq\b", t)
-        ):
-            return "Docs"
-
-        # 6) OTHER (status/* etc. stay here; they're workflow, not type)
-        return "Other"
+        return self.classifier.classify(labels, title)
 
     # --------- “Other” breakdown (CLI only) ----------
     def _print_other_breakdown(self, norm_period_df: pd.DataFrame, period_label: str, top_k: int = 10) -> None:
@@ -400,42 +339,46 @@ class MostActiveCategoriesAnalyser:
         :param show_category_state_bars: Also render Open vs Closed grouped bars.
         """
         issues = self._load_issues()
-        ev = self._flatten_events(issues)
+        ev = self._flatten_events(self.loader.get_event_table())
 
         if ev.empty:
             print("No events to analyze.")
             return
 
-        years_available = sorted(ev["year"].dropna().unique())
+        # Sort the events by year once so that each period is a contiguous range
+        # (undated events sort first and are never in a period)
+        ev = ev.sort_values("year", kind="stable").reset_index(drop=True)
+        years_available = sorted(ev.loc[ev["year"] != self.NO_YEAR, "year"].unique())
         if not years_available:
             print("No years found in events.")
             return
 
         # ---- Period selection
         if start_year is not None and end_year is not None:
-            ev_period = ev[(ev["year"] >= start_year) & (ev["year"] <= end_year)].copy()
+            ev_period = self._events_in_years(ev, start_year, end_year)
             period_label = f"{start_year}-{end_year}"
         else:
             if year is None:
                 year = int(years_available[-1])
-            ev_period = ev[ev["year"] == year].copy()
+            ev_period = self._events_in_years(ev, year, year)
             period_label = str(year)
 
         if ev_period.empty:
             print(f"No events found for selected period {period_label}.")
             return
 
-        # ---- Maps (labels/state)
-        id_to_labels: Dict[str, List[str]] = {}
-        id_to_state: Dict[str, str] = {}
-        for it in issues:
-            iid = self._iid(it)
-            id_to_labels[iid] = self._label_names(it.get("labels", []) or [])
-            id_to_state[iid] = (it.get("state") or "").lower() or "-"
+        # ---- Position of each issue id in the issue list, to look up labels and state
+        issue_ids = [self._iid(it) for it in issues]
+        position_of = {iid: pos for pos, iid in enumerate(issue_ids)}
+        rows = ev_period["issue"].to_numpy()
+        ev_period["issue_id"] = np.asarray(issue_ids, dtype=object)[rows]
+        ev_period["title"] = np.asarray([it.title or "" for it in issues], dtype=object)[rows]
 
         # ---- Event counts (per issue, per event_type)
-        counts = (ev_period.groupby(["issue_id", "title", "event_type"])
+        counts = (ev_period.groupby(["issue_id", "title", "event_type"], observed=True)
                   .size().rename("count").reset_index())
+        # Only the event types that occur become columns of the pivot
+        counts["event_type"] = counts["event_type"].astype(object)
 
         pivot = (counts.pivot_table(index=["issue_id", "title"],
                                     columns="event_type",
@@ -454,13 +397,13 @@ class MostActiveCategoriesAnalyser:
             norm[c] = (col > 0).astype(float) if rng == 0 else (col - col.min()) / rng
 
         # ---- Metadata + classification
-        norm["labels"] = norm["issue_id"].map(lambda iid: id_to_labels.get(iid, []))
-        norm["state"] = norm["issue_id"].map(lambda iid: id_to_state.get(iid, "-"))
+        positions = norm["issue_id"].map(position_of).tolist()
+        # The same label names as in the label index that --labels is matched against
+        norm["labels"] = [label_names(issues[pos].labels) for pos in positions]
+        norm["state"] = [(issues[pos].state or "").lower() or "-" for pos in positions]
         title_map = dict(zip(pivot["issue_id"], pivot["title"]))
-        norm["type"] = norm.apply(
-            lambda r: self._classify_type(r["labels"], title_map.get(r["issue_id"], "")),
-            axis=1
-        )
+        norm["type"] = self.classifier.classify_many(
+            norm["labels"], [title_map.get(iid, "") for iid in norm["issue_id"]])
         norm["color"] = norm["type"].apply(lambda t: self.CATEGORY_COLORS.get(t, "#7f7f7f"))
 
         # ---- Keep a copy BEFORE filters for "Other" breakdown
@@ -480,12 +423,13 @@ class MostActiveCategoriesAnalyser:
         if filter_labels:
             needles = [s.strip().lower() for s in filter_labels.split(",") if s.strip()]
 
-            def _match_labels(lbls: List[str]) -> bool:
-                low = [x.lower() for x in (lbls or [])]
-                return any(any(n in lab for lab in low) for n in needles)
-
-            mask = working["labels"].apply(_match_labels)
-            working = working[mask]
+            # Match the needles against the distinct labels once and OR the bitmaps
+            # of the matching labels instead of checking the labels of every row
+            label_index = self.loader.get_label_index()
+            matching = Bitmap(size=label_index.size)
+            for needle in needles:
+                matching |= label_index.containing(needle)
+            working = working[working["issue_id"].isin(set(matching.select(issue_ids)))]
             if working.empty:
                 print(f"No issues found for raw label(s): {needles} in {period_label}")
                 self._print_other_breakdown(norm_period_all, period_label=period_label, top_k=10)
@@ -559,7 +503,8 @@ if __name__ == "__main__":
     import argparse
 
     ap = argparse.ArgumentParser("MostActiveCategoriesAnalyser")
-    ap.add_argument("--data", type=str, default="./poetry_issues.json", help="Path to issues JSON")
+    ap.add_argument("--data", type=str, default=None,
+                    help="Path to issues JSON (defaults to the ENPM611_PROJECT_DATA_PATH setting)")
     ap.add_argument("--year", type=int, required=False)
     ap.add_argument("--start-year", type=int, required=False)
     ap.add_argument("--end-year", type=int, required=False)
@@ -7,6 +7,7 @@ import pandas as pd
 from tabulate import tabulate
 
 from data_loader import DataLoader
+from label_index import Bitmap, LabelIndex
 
 
 class MultiAreaImpactAnalyzer:
@@ -58,48 +59,43 @@ class MultiAreaImpactAnalyzer:
             except Exception as e:
                 print(f"Invalid input. Please enter a number between 1-6.")
     
-    # filter based on input
-    def _filter_issues_by_timeline(self, issues: List, months: int) -> List:
-        
-        # All issues
+    # Cutoff date for the selected timeline (None for all time)
+    def _get_cutoff_date(self, months: int):
         if months == 0:
-            return issues
-            
-        cutoff_date = datetime.now() - timedelta(days=months * 30)
-        filtered_issues = []
-        
-        for issue in issues:
-            try:
-                if issue.created_date and issue.created_date >= cutoff_date:
-                    filtered_issues.append(issue)
-            except:
-                # If date parsing fails, include the issue to be safe
-                filtered_issues.append(issue)
-                
-        return filtered_issues
+            return None
+        return datetime.now() - timedelta(days=months * 30)
     
     def _analyze_multi_area_issues(self, issues: List) -> Tuple[List[Dict], Dict[str, int]]:
         multi_area_issues = []
         area_impact_count = {}
         
-        for issue in issues:
+        # Find the issues with more than one area label with bitmaps of the
+        # issues per area label, so the labels of other issues are not scanned
+        index = LabelIndex.from_issues(issues)
+        areas = self._get_area_labels(index.labels())
+        seen = Bitmap(size=len(issues))
+        multi_area = Bitmap(size=len(issues))
+        for area in areas:
+            with_area = index.label(area)
+            multi_area |= seen & with_area
+            seen |= with_area
+        
+        for issue in multi_area.select(issues):
             area_labels = self._get_area_labels(issue.labels)
+            issue_data = {
+                'number': issue.number,
+                'title': issue.title,
+                'area_labels': area_labels,
+                'area_count': len(area_labels),
+                'state': issue.state.value if issue.state else 'unknown',
+                'created_date': issue.created_date,
+                'creator': issue.creator
+            }
+            multi_area_issues.append(issue_data)
             
-            if len(area_labels) > 1:  # Multi-area impact
-                issue_data = {
-                    'number': issue.number,
-                    'title': issue.title,
-                    'area_labels': area_labels,
-                    'area_count': len(area_labels),
-                    'state': issue.state.value if issue.state else 'unknown',
-                    'created_date': issue.created_date,
-                    'creator': issue.creator
-                }
-                multi_area_issues.append(issue_data)
-                
-                # Count impact per area
-                for area in area_labels:
-                    area_impact_count[area] = area_impact_count.get(area, 0) + 1
+            # Count impact per area
+            for area in area_labels:
+                area_impact_count[area] = area_impact_count.get(area, 0) + 1
         
         # Sort by number of areas impacted (highest first)
         multi_area_issues.sort(key=lambda x: x['area_count'], reverse=True)
@@ -157,8 +153,10 @@ class MultiAreaImpactAnalyzer:
         
         print(f"\nLoading issues data...")
         
-        all_issues = self.data_loader.get_issues()
-        filtered_issues = self._filter_issues_by_timeline(all_issues, timeline_months)
+        # Only issues created after the cutoff are loaded
+        filtered_issues = self.data_loader.get_issues(
+            fields=['number', 'title', 'labels', 'state', 'created_date', 'creator'],
+            created_after=self._get_cutoff_date(timeline_months))
         
         timeline_text = f"last {timeline_months} months" if timeline_months > 0 else "all time"
         print(f"Analyzing {len(filtered_issues)} issues from the {timeline_text}...")
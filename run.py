@@ -8,6 +8,8 @@ the command line to run the analyses.
 import argparse
 
 import config
+import memory_report
+from data_loader import DataLoader
 from example_analysis import ExampleAnalysis
 from resolution_time_analyser import ResolutionTimeAnalyser
 from top_user_activity import TopUserActivityAnalyser
@@ -50,6 +52,8 @@ def parse_args():
                     help="Filter by issue type: Bug, Feature, Docs, Dependency, Infra, Other. Comma-separated allowed.")
     ap.add_argument("--labels", type=str, required=False,
                     help="Filter by raw labels (comma-separated, case-insensitive substring).")
+    ap.add_argument("--memory-report", action="store_true",
+                    help="Report the memory used while loading the issues before running the feature.")
 
     
     return ap.parse_args()
@@ -61,6 +65,9 @@ def parse_args():
 args = parse_args()
 # Add arguments to config so that they can be accessed in other parts of the application
 config.overwrite_from_args(args)
+
+if args.memory_report:
+    memory_report.print_load_profile(DataLoader().get_memory_report())
     
 # Run the feature specified in the --feature flag
 if args.feature == 0:
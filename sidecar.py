@@ -0,0 +1,42 @@
+"""
+Helpers shared by the formats that cache the parsed issues in a sidecar
+next to the data file (snapshot, column_store and sqlite_store).
+
+A sidecar is only a cache: it records the fingerprint of the data file
+it was built from (see snapshot.fingerprint), and one that is outdated or
+cannot be read is ignored and the data file is parsed again. Sidecars are
+written under a temporary name and moved into place once complete, so
+readers never see a partially written one.
+"""
+
+import os
+from datetime import datetime, timezone
+from typing import Optional
+
+
+def sidecar_path(data_path:str, suffix:str) -> str:
+    """
+    Path of a sidecar of a data file (or directory): <data file><suffix>.
+    """
+    return data_path.rstrip('/\\') + suffix
+
+
+def temporary_path(path:str) -> str:
+    """
+    Name under which this process writes a sidecar before moving it into place.
+    """
+    return f'{path}.{os.getpid()}.tmp'
+
+
+def to_epoch(value:Optional[datetime], missing:any=None) -> any:
+    """
+    Date as whole UTC seconds since the epoch, or missing for None.
+    """
+    return int(value.timestamp()) if value is not None else missing
+
+
+def from_epoch(value:any, missing:any=None) -> Optional[datetime]:
+    """
+    UTC date of whole seconds since the epoch; None for missing.
+    """
+    return datetime.fromtimestamp(value, timezone.utc) if value is not None and value != missing else None
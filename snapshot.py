@@ -0,0 +1,497 @@
+"""
+Binary snapshot of the parsed issues. The snapshot is written next to
+the data file the first time the data is loaded and is used on subsequent
+runs instead of parsing the JSON (and all of its timestamps) again.
+
+The snapshot file consists of:
+
+    1. header  - pickle frame with the format version and the fingerprint
+                 of the source file
+    2. text    - 8-byte little-endian length followed by the UTF-8 encoded
+                 titles, bodies and comments, back to back. The snapshot is
+                 memory-mapped when loaded so that this text stays off-heap
+                 (see text_heap)
+    3. index position - 8-byte little-endian offset of the index
+    4. blocks  - pickle frames with the compact tuples of BLOCK_SIZE issues
+                 each, with timestamps stored as epoch seconds, texts stored
+                 as (offset, length) into the text section and repeated
+                 strings interned so they are only written (and loaded) once
+                 per block
+    5. index   - pickle frame with the offsets of the blocks, the number
+                 and state of each issue and the positions of the issues
+                 sorted by creation time, so that loads filtered by creation
+                 time or state (see issue_filter) only unpickle the blocks
+                 that contain matching issues
+    6. deltas  - zero or more segments appended by append_delta(), each a
+                 pickle frame with the fingerprint of the delta file, the
+                 8-byte length of its texts, the texts and a pickle frame
+                 with the records of the issues in the delta. When loaded,
+                 these records are merged into the issues of the blocks
+"""
+
+import logging
+logger = logging.getLogger(__name__)
+
+import hashlib
+import os
+import pickle
+import sys
+from bisect import bisect_left
+from datetime import datetime
+from functools import partial
+from typing import AbstractSet, Dict, List, Optional, Tuple
+
+import sidecar
+from issue_filter import IssueFilter
+from model import Issue, Event, State
+from text_heap import TextHeap
+
+SNAPSHOT_SUFFIX:str = '.snapshot'
+FORMAT_VERSION:int = 4
+
+# Number of issues per block of records
+BLOCK_SIZE:int = 256
+
+_HASH_CHUNK_SIZE:int = 1 << 20
+
+
+def snapshot_path(data_path:str) -> str:
+    """
+    Path of the sidecar snapshot file for a data file (or directory).
+    """
+    return sidecar.sidecar_path(data_path, SNAPSHOT_SUFFIX)
+
+
+def fingerprint(data_path:str, with_hash:bool=True) -> Dict[str, any]:
+    """
+    Identifies the exact contents of a data file (or of all files in
+    a data directory) by its size, modification time and (optionally)
+    a content hash.
+    """
+    stats = [os.stat(path) for path in _files(data_path)]
+    fp = {'size': sum(stat.st_size for stat in stats),
+          'mtime_ns': max((stat.st_mtime_ns for stat in stats), default=0),
+          'files': len(stats)}
+    if with_hash:
+        fp['hash'] = content_hash(data_path)
+    return fp
+
+
+def content_hash(data_path:str) -> str:
+    """
+    Hex digest of the contents of a file (or of the names and contents
+    of all files in a directory).
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    for path in _files(data_path):
+        if path != data_path:
+            digest.update(os.path.basename(path).encode('utf-8'))
+        with open(path, 'rb') as fin:
+            for chunk in iter(lambda: fin.read(_HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _files(data_path:str) -> List[str]:
+    if not os.path.isdir(data_path):
+        return [data_path]
+    return sorted(os.path.join(data_path, name) for name in os.listdir(data_path)
+                  if os.path.isfile(os.path.join(data_path, name)))
+
+
+def is_valid(data_path:str, source:Dict[str, any]) -> bool:
+    """
+    Checks whether a snapshot taken from the given source fingerprint
+    still matches the data file. Size and modification time are checked
+    first; the content hash is only computed when the file was touched
+    without changing its size.
+    """
+    current = fingerprint(data_path, with_hash=False)
+    if current['size'] != source.get('size') or current['files'] != source.get('files', 1):
+        return False
+    if current['mtime_ns'] == source.get('mtime_ns'):
+        return True
+    return content_hash(data_path) == source.get('hash')
+
+
+def load(data_path:str, off_heap:bool=True, fields:AbstractSet[str]=None,
+         event_fields:AbstractSet[str]=None, issue_filter:IssueFilter=None) -> Optional[List[Issue]]:
+    """
+    Loads the issues from the snapshot of a data file. Returns None
+    if there is no snapshot or it is outdated or unreadable. With off_heap,
+    the texts are decoded from the memory-mapped snapshot when accessed,
+    otherwise they are decoded right away. If fields (or event_fields) is
+    given, only those fields of the issues (or their events) are decoded.
+    With an issue_filter, only the matching issues are loaded.
+    """
+    path = snapshot_path(data_path)
+    if not os.path.isfile(path):
+        return None
+    try:
+        with open(path, 'rb') as fin:
+            header = pickle.load(fin)
+            if header.get('version') != FORMAT_VERSION:
+                logger.info(f'Ignoring snapshot {path} with format version {header.get("version")}')
+                return None
+            if not is_valid(data_path, header.get('source', {})):
+                logger.info(f'Ignoring outdated snapshot {path}')
+                return None
+            text_size = int.from_bytes(fin.read(8), 'little')
+            text_base = fin.tell()
+            fin.seek(text_base + text_size)
+            fin.seek(int.from_bytes(fin.read(8), 'little'))
+            index = pickle.load(fin)
+            deltas = [records for _, records in _read_deltas(fin)]
+            records = _load_records(fin, index, issue_filter, deltas)
+        texts = _TextReader(TextHeap.open(path), text_base, off_heap)
+        return [_issue_from_record(rec, texts, fields, event_fields) for rec in records]
+    except Exception as e:
+        logger.warning(f'Could not read snapshot {path}: {e}')
+        return None
+
+
+def save(data_path:str, issues:List[Issue], source:Dict[str, any]=None) -> bool:
+    """
+    Writes the snapshot of a data file. The fingerprint of the source
+    should be taken before the issues were parsed so that changes made
+    while parsing invalidate the snapshot.
+    """
+    path = snapshot_path(data_path)
+    tmp_path = sidecar.temporary_path(path)
+    header = {'version': FORMAT_VERSION, 'source': source or fingerprint(data_path)}
+    try:
+        with open(tmp_path, 'wb') as fout:
+            pickle.dump(header, fout, protocol=pickle.HIGHEST_PROTOCOL)
+            # The length of the text section is only known once all texts are written
+            size_pos = fout.tell()
+            fout.write(bytes(8))
+            texts = _TextWriter(fout)
+            records = [_issue_to_record(issue, texts) for issue in issues]
+            index_pos = fout.tell()
+            fout.write(bytes(8))
+            block_offsets = []
+            for start in range(0, len(records), BLOCK_SIZE):
+                block_offsets.append(fout.tell())
+                pickle.dump(records[start:start + BLOCK_SIZE], fout, protocol=pickle.HIGHEST_PROTOCOL)
+            index = _build_index(issues, block_offsets)
+            end_pos = fout.tell()
+            pickle.dump(index, fout, protocol=pickle.HIGHEST_PROTOCOL)
+            fout.seek(size_pos)
+            fout.write((index_pos - texts.base).to_bytes(8, 'little'))
+            fout.seek(index_pos)
+            fout.write(end_pos.to_bytes(8, 'little'))
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f'Could not write snapshot {path}: {e}')
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    return True
+
+
+def append_delta(data_path:str, issues:List[Issue], delta_source:Dict[str, any]) -> bool:
+    """
+    Appends the issues of a delta file (see DataLoader.apply_delta()) to
+    the snapshot of a data file without rewriting it. delta_source is the
+    fingerprint of the delta file; a delta that was appended already is
+    not appended again. Returns False if there is no up-to-date snapshot.
+    
+    Appending is not atomic, but readers ignore an incomplete last segment.
+    """
+    path = snapshot_path(data_path)
+    if not os.path.isfile(path):
+        return False
+    try:
+        with open(path, 'r+b') as fout:
+            header = pickle.load(fout)
+            if header.get('version') != FORMAT_VERSION or not is_valid(data_path, header.get('source', {})):
+                return False
+            text_size = int.from_bytes(fout.read(8), 'little')
+            text_base = fout.tell()
+            fout.seek(text_base + text_size)
+            fout.seek(int.from_bytes(fout.read(8), 'little'))
+            pickle.load(fout)
+            if any(source.get('hash') == delta_source.get('hash') for source, _ in _read_deltas(fout)):
+                return True
+            # Drop what is left of an incomplete segment
+            fout.truncate()
+            pickle.dump({'delta': delta_source}, fout, protocol=pickle.HIGHEST_PROTOCOL)
+            size_pos = fout.tell()
+            fout.write(bytes(8))
+            # Offsets are relative to the text section so one reader resolves all texts
+            texts = _TextWriter(fout, text_base)
+            records = [_issue_to_record(issue, texts) for issue in issues]
+            end_pos = fout.tell()
+            fout.seek(size_pos)
+            fout.write((end_pos - size_pos - 8).to_bytes(8, 'little'))
+            fout.seek(end_pos)
+            pickle.dump(records, fout, protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError as e:
+        logger.warning(f'Could not append delta to snapshot {path}: {e}')
+        return False
+    return True
+
+
+def _read_deltas(fin) -> List[Tuple[Dict[str, any], List[tuple]]]:
+    """
+    Reads the delta segments that follow the index (the file must be
+    positioned at the end of the index) as (fingerprint, records) pairs.
+    The file is left positioned at the end of the last complete segment.
+    """
+    deltas = []
+    while True:
+        end = fin.tell()
+        try:
+            header = pickle.load(fin)
+            text_size = int.from_bytes(fin.read(8), 'little')
+            fin.seek(text_size, os.SEEK_CUR)
+            deltas.append((header['delta'], pickle.load(fin)))
+        except EOFError:
+            fin.seek(end)
+            break
+        except (pickle.UnpicklingError, KeyError, ValueError) as e:
+            # A segment that is still being appended (or was left incomplete)
+            logger.info(f'Ignoring incomplete delta in snapshot: {e}')
+            fin.seek(end)
+            break
+    return deltas
+
+
+def merge_records(old:tuple, new:tuple) -> tuple:
+    """
+    Merges the record of an issue from a delta into its earlier record:
+    the fields are taken from the delta and its events that are not in
+    the earlier record (by type, author, date and label) are appended.
+    """
+    known = {event[:4] for event in old[11]}
+    return new[:11] + (old[11] + [event for event in new[11] if event[:4] not in known],)
+
+
+def _build_index(issues:List[Issue], block_offsets:List[int]) -> Dict[str, any]:
+    created = [(issue.created_date.timestamp(), pos) for pos, issue in enumerate(issues)
+               if issue.created_date is not None]
+    created.sort()
+    return {
+        'num_issues': len(issues),
+        'block_size': BLOCK_SIZE,
+        'block_offsets': block_offsets,
+        'numbers': [issue.number for issue in issues],
+        'states': [issue.state.value if issue.state is not None else None for issue in issues],
+        # Creation times in ascending order and the positions of the issues
+        'created': [timestamp for timestamp, _ in created],
+        'created_positions': [pos for _, pos in created],
+    }
+
+
+def _load_records(fin, index:Dict[str, any], issue_filter:Optional[IssueFilter],
+                  deltas:List[List[tuple]]) -> List[tuple]:
+    """
+    Reads the records of the issues that match the filter (all issues
+    without a filter), in their original order, with the deltas merged in.
+    Issues that only appear in deltas come last.
+    """
+    # Issues changed by a delta are read regardless of the filter since
+    # the delta may change whether they match
+    touched = {rec[7] for records in deltas for rec in records}
+    positions = _matching_positions(index, issue_filter)
+    if positions is not None and touched:
+        positions = sorted(set(positions).union(
+            pos for pos, number in enumerate(index['numbers']) if number in touched))
+    records = _read_blocks(fin, index, positions)
+    if not deltas:
+        return records
+    
+    by_number = {rec[7]: n for n, rec in enumerate(records)}
+    for delta in deltas:
+        for rec in delta:
+            n = by_number.get(rec[7])
+            if n is None:
+                by_number[rec[7]] = len(records)
+                records.append(rec)
+            else:
+                records[n] = merge_records(records[n], rec)
+    if issue_filter is not None and not issue_filter.selects_all:
+        records = [rec for rec in records if rec[7] not in touched or
+                   issue_filter.matches(_timestamp(rec[8]), rec[3])]
+    return records
+
+
+def _matching_positions(index:Dict[str, any], issue_filter:Optional[IssueFilter]) -> Optional[List[int]]:
+    """
+    Positions of the issues in the blocks that match the filter, or None
+    for all issues.
+    """
+    if issue_filter is None or issue_filter.selects_all:
+        return None
+    if issue_filter.has_time_range:
+        created = index['created']
+        start = 0 if issue_filter.created_after is None else bisect_left(created, issue_filter.created_after)
+        end = len(created) if issue_filter.created_before is None \
+            else bisect_left(created, issue_filter.created_before)
+        positions = sorted(index['created_positions'][start:end])
+    else:
+        positions = list(range(index['num_issues']))
+    if issue_filter.states is not None:
+        states = index['states']
+        positions = [pos for pos in positions if states[pos] in issue_filter.states]
+    return positions
+
+
+def _read_blocks(fin, index:Dict[str, any], positions:Optional[List[int]]) -> List[tuple]:
+    """
+    Reads the records at the given (sorted) positions, only unpickling
+    the blocks that contain them, or all records if positions is None.
+    """
+    offsets = index['block_offsets']
+    records = []
+    if positions is None:
+        for offset in offsets:
+            fin.seek(offset)
+            records.extend(pickle.load(fin))
+        return records
+    block_size = index['block_size']
+    block, block_records = None, None
+    for pos in positions:
+        if pos // block_size != block:
+            block = pos // block_size
+            fin.seek(offsets[block])
+            block_records = pickle.load(fin)
+        records.append(block_records[pos % block_size])
+    return records
+
+
+def _timestamp(value:any) -> Optional[float]:
+    # Creation time of a record (see _encode_date) as seconds since the epoch
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return value
+
+
+class _TextWriter:
+    """
+    Appends texts to the text section of a snapshot being written.
+    """
+    
+    def __init__(self, fout, base:int=None):
+        self.fout = fout
+        # Position that the offsets of the texts are relative to
+        self.base:int = fout.tell() if base is None else base
+    
+    def __call__(self, value:Optional[str]) -> Optional[Tuple[int, int]]:
+        if value is None:
+            return None
+        data = value.encode('utf-8')
+        offset = self.fout.tell() - self.base
+        self.fout.write(data)
+        return (offset, len(data))
+
+
+class _TextReader:
+    """
+    Turns the (offset, length) pairs of a loaded snapshot into texts.
+    """
+    
+    def __init__(self, heap:TextHeap, base:int, off_heap:bool):
+        self.heap:TextHeap = heap
+        self.base:int = base
+        self.off_heap:bool = off_heap
+    
+    def __call__(self, value:Optional[Tuple[int, int]]) -> any:
+        if value is None:
+            return None
+        ref = self.heap.ref(self.base + value[0], value[1])
+        return ref if self.off_heap else ref.decode()
+
+
+def _intern(value:Optional[str]) -> Optional[str]:
+    # Interned strings are the same object, which pickle writes only once
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _encode_date(value:Optional[datetime]) -> any:
+    """
+    Stores whole-second UTC dates (all dates in the dump) as epoch
+    seconds and keeps any other date as is.
+    """
+    if value is not None and value.microsecond == 0 and value.utcoffset() is not None \
+            and value.utcoffset().total_seconds() == 0:
+        return sidecar.to_epoch(value)
+    return value
+
+
+def _decode_date(value:any) -> Optional[datetime]:
+    if isinstance(value, int):
+        return sidecar.from_epoch(value)
+    return value
+
+
+def _issue_to_record(issue:Issue, texts:_TextWriter) -> tuple:
+    return (
+        issue.url,
+        _intern(issue.creator),
+        tuple(_intern(label) for label in issue.labels),
+        issue.state.value if issue.state is not None else None,
+        tuple(_intern(assignee) for assignee in issue.assignees),
+        texts(issue.title),
+        texts(issue.text),
+        issue.number,
+        _encode_date(issue.created_date),
+        _encode_date(issue.updated_date),
+        issue.timeline_url,
+        [(_intern(event.event_type), _intern(event.author), _encode_date(event.event_date),
+          _intern(event.label), texts(event.comment)) for event in issue.build_events()],
+    )
+
+
+def _issue_from_record(rec:tuple, texts:_TextReader, fields:AbstractSet[str]=None,
+                       event_fields:AbstractSet[str]=None) -> Issue:
+    (url, creator, labels, state, assignees, title, text, number,
+     created_date, updated_date, timeline_url, events) = rec
+    fields = Issue.FIELDS if fields is None else fields
+    issue = Issue()
+    if 'url' in fields:
+        issue.url = url
+    if 'creator' in fields:
+        issue.creator = creator
+    if 'labels' in fields:
+        issue.labels = list(labels)
+    if 'state' in fields:
+        issue.state = State(state) if state is not None else None
+    if 'assignees' in fields:
+        issue.assignees = list(assignees)
+    if 'title' in fields:
+        issue.title = texts(title)
+    if 'text' in fields:
+        issue.text = texts(text)
+    if 'number' in fields:
+        issue.number = number
+    if 'created_date' in fields:
+        issue.created_date = _decode_date(created_date)
+    if 'updated_date' in fields:
+        issue.updated_date = _decode_date(updated_date)
+    if 'timeline_url' in fields:
+        issue.timeline_url = timeline_url
+    if 'events' in fields:
+        issue.set_event_loader(partial(_events_from_records, events, texts, event_fields))
+    return issue
+
+
+def _events_from_records(records:List[tuple], texts:_TextReader,
+                         fields:AbstractSet[str]=None) -> List[Event]:
+    return [_event_from_record(rec, texts, Event.FIELDS if fields is None else fields) for rec in records]
+
+
+def _event_from_record(rec:tuple, texts:_TextReader, fields:AbstractSet[str]) -> Event:
+    event_type, author, event_date, label, comment = rec
+    event = Event(None)
+    if 'event_type' in fields:
+        event.event_type = event_type
+    if 'author' in fields:
+        event.author = author
+    if 'event_date' in fields:
+        event.event_date = _decode_date(event_date)
+    if 'label' in fields:
+        event.label = label
+    if 'comment' in fields:
+        event.comment = texts(comment)
+    return event
@@ -0,0 +1,326 @@
+"""
+SQLite database of the issue data, so that analyses can push filtering
+and grouping into indexed SQL queries instead of looping over all issues
+and events in Python. The data file is ingested once; later runs open
+the database without reading the data file.
+
+Schema
+------
+The database is a single file next to the data file (<data file>.sqlite):
+
+    meta(key TEXT PRIMARY KEY, value TEXT)
+        'version': FORMAT_VERSION
+        'source':  JSON fingerprint of the data file, see snapshot.fingerprint
+
+    issues(id INTEGER PRIMARY KEY, number, url, creator, state, title, text,
+           created_date, updated_date, timeline_url)
+        id is the position of the issue in the issue list (data file
+        order). created_date and updated_date are UTC seconds since the
+        epoch (NULL if missing).
+
+    labels(issue_id, position, label, is_json)
+    assignees(issue_id, position, assignee, is_json)
+        One row per label (assignee) of an issue, in list order. is_json
+        is 1 if the entry is not a plain string (e.g. a full GitHub user
+        object) and is stored JSON encoded.
+
+    events(id INTEGER PRIMARY KEY, issue_id, event_type, author,
+           event_date, label, comment)
+        One row per event, grouped by issue in data file order. event_date
+        is UTC seconds since the epoch (NULL if missing).
+
+Indexes: issues(number), issues(created_date), issues(creator),
+labels(label), assignees(assignee), events(issue_id), events(author),
+events(event_type), events(event_date).
+"""
+
+import logging
+logger = logging.getLogger(__name__)
+
+import json
+import math
+import os
+import sqlite3
+from functools import partial
+from typing import AbstractSet, Dict, Iterable, List, Optional, Tuple
+
+import sidecar
+import snapshot
+from issue_filter import IssueFilter
+from model import Issue, Event, State
+from time_index import TimeBound, to_timestamp
+
+DATABASE_SUFFIX:str = '.sqlite'
+FORMAT_VERSION:int = 1
+
+_SCHEMA:str = '''
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE issues (id INTEGER PRIMARY KEY, number INTEGER, url TEXT, creator TEXT, state TEXT,
+                     title TEXT, text TEXT, created_date INTEGER, updated_date INTEGER, timeline_url TEXT);
+CREATE TABLE labels (issue_id INTEGER, position INTEGER, label TEXT, is_json INTEGER);
+CREATE TABLE assignees (issue_id INTEGER, position INTEGER, assignee TEXT, is_json INTEGER);
+CREATE TABLE events (id INTEGER PRIMARY KEY, issue_id INTEGER, event_type TEXT, author TEXT,
+                     event_date INTEGER, label TEXT, comment TEXT);
+'''
+
+# Created after the rows are inserted, which is faster than maintaining them while inserting
+_INDEXES:str = '''
+CREATE INDEX issues_number ON issues (number);
+CREATE INDEX issues_created_date ON issues (created_date);
+CREATE INDEX issues_creator ON issues (creator);
+CREATE INDEX labels_issue_id ON labels (issue_id);
+CREATE INDEX labels_label ON labels (label);
+CREATE INDEX assignees_issue_id ON assignees (issue_id);
+CREATE INDEX assignees_assignee ON assignees (assignee);
+CREATE INDEX events_issue_id ON events (issue_id);
+CREATE INDEX events_author ON events (author);
+CREATE INDEX events_event_type ON events (event_type);
+CREATE INDEX events_event_date ON events (event_date);
+'''
+
+# Issue field (see Issue.FIELDS) that each column of the issues table is read for
+_COLUMN_FIELDS:Dict[str, str] = {
+    'url': 'url',
+    'creator': 'creator',
+    'state': 'state',
+    'title': 'title',
+    'text': 'text',
+    'number': 'number',
+    'created_date': 'created_date',
+    'updated_date': 'updated_date',
+    'timeline_url': 'timeline_url',
+}
+
+# Columns of the events table that events can be grouped by
+_EVENT_GROUPS:Tuple[str, ...] = ('author', 'event_type', 'label')
+
+
+def database_path(data_path:str) -> str:
+    """
+    Path of the SQLite database for a data file.
+    """
+    return sidecar.sidecar_path(data_path, DATABASE_SUFFIX)
+
+
+class SqliteStore:
+    """
+    Connection to the SQLite database of a data file.
+    """
+
+    def __init__(self, path:str, connection:sqlite3.Connection):
+        """
+        Constructor. Use SqliteStore.open() to open a database.
+        """
+        self.path:str = path
+        self.connection:sqlite3.Connection = connection
+
+    @classmethod
+    def open(cls, data_path:str) -> Optional['SqliteStore']:
+        """
+        Opens the database of a data file. Returns None if there is no
+        database or it is outdated or unreadable.
+        """
+        path = database_path(data_path)
+        if not os.path.isfile(path):
+            return None
+        connection = None
+        try:
+            connection = sqlite3.connect(path)
+            meta = dict(connection.execute('SELECT key, value FROM meta'))
+            if meta.get('version') != str(FORMAT_VERSION):
+                logger.info(f'Ignoring database {path} with format version {meta.get("version")}')
+                connection.close()
+                return None
+            if not snapshot.is_valid(data_path, json.loads(meta.get('source', '{}'))):
+                logger.info(f'Ignoring outdated database {path}')
+                connection.close()
+                return None
+            return cls(path, connection)
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f'Could not open database {path}: {e}')
+            if connection is not None:
+                connection.close()
+            return None
+
+    def query(self, sql:str, params:Iterable[any]=()) -> List[tuple]:
+        """
+        Runs a query and returns all result rows.
+        """
+        return self.connection.execute(sql, tuple(params)).fetchall()
+
+    def num_issues(self) -> int:
+        return self.connection.execute('SELECT COUNT(*) FROM issues').fetchone()[0]
+
+    def event_counts(self, group_by:str='author', start:TimeBound=None, end:TimeBound=None,
+                     event_type:str=None) -> Dict[str, int]:
+        """
+        Number of events with start <= event_date < end (optionally only
+        of one event type) per author, event type or label, e.g. the
+        comments per author in 2024. Events without a value for group_by
+        are not counted.
+        """
+        if group_by not in _EVENT_GROUPS:
+            raise ValueError(f'Cannot group events by {group_by}')
+        conditions, params = [f'{group_by} IS NOT NULL'], []
+        start, end = to_timestamp(start), to_timestamp(end)
+        if start is not None:
+            conditions.append('event_date >= ?')
+            params.append(start)
+        if end is not None:
+            conditions.append('event_date < ?')
+            params.append(end)
+        if event_type is not None:
+            conditions.append('event_type = ?')
+            params.append(event_type)
+        return dict(self.query(f'SELECT {group_by}, COUNT(*) FROM events WHERE {" AND ".join(conditions)} '
+                               f'GROUP BY {group_by}', params))
+
+    def issues(self, fields:AbstractSet[str]=None, event_fields:AbstractSet[str]=None,
+               issue_filter:IssueFilter=None) -> List[Issue]:
+        """
+        Builds Issue objects from the database. Events are read when first
+        accessed. If fields (or event_fields) is given, only those fields of
+        the issues (or their events) are read. With an issue_filter, only
+        the matching issues are read.
+        """
+        fields = Issue.FIELDS if fields is None else fields
+        columns = [column for column, field in _COLUMN_FIELDS.items() if field in fields]
+        where, params = _filter_sql(issue_filter)
+        rows = self.query(f'SELECT {", ".join(["id"] + columns)} FROM issues{where} ORDER BY id', params)
+        labels = self._lists('labels', 'label', where, params) if 'labels' in fields else {}
+        assignees = self._lists('assignees', 'assignee', where, params) if 'assignees' in fields else {}
+
+        issues = []
+        for row in rows:
+            issue = Issue()
+            values = dict(zip(columns, row[1:]))
+            for column, value in values.items():
+                if column == 'state':
+                    value = State(value) if value is not None else None
+                elif column in ('created_date', 'updated_date'):
+                    value = sidecar.from_epoch(value)
+                setattr(issue, _COLUMN_FIELDS[column], value)
+            if 'labels' in fields:
+                issue.labels = labels.get(row[0], [])
+            if 'assignees' in fields:
+                issue.assignees = assignees.get(row[0], [])
+            if 'events' in fields:
+                issue.set_event_loader(partial(self._events, row[0], event_fields))
+            issues.append(issue)
+        return issues
+
+    def upsert(self, issues:Iterable[Tuple[int, Issue]]):
+        """
+        Replaces (or adds) the issues at the given positions of the issue
+        list together with their labels, assignees and events, e.g. to apply
+        a delta without rebuilding the database.
+        """
+        with self.connection:
+            for position, issue in issues:
+                for table in ('labels', 'assignees', 'events'):
+                    self.connection.execute(f'DELETE FROM {table} WHERE issue_id = ?', (position,))
+                _insert(self.connection, position, issue)
+
+    def close(self):
+        self.connection.close()
+
+    def _lists(self, table:str, column:str, where:str, params:List[any]) -> Dict[int, list]:
+        # Entries of a list field of the issues that match a filter, by issue id
+        sql = f'SELECT issue_id, {column}, is_json FROM {table}'
+        if where:
+            sql += f' WHERE issue_id IN (SELECT id FROM issues{where})'
+        lists:Dict[int, list] = {}
+        for issue_id, value, is_json in self.query(sql + ' ORDER BY issue_id, position', params):
+            lists.setdefault(issue_id, []).append(json.loads(value) if is_json else value)
+        return lists
+
+    def _events(self, issue_id:int, fields:AbstractSet[str]=None) -> List[Event]:
+        fields = Event.FIELDS if fields is None else fields
+        columns = [field for field in Event.FIELDS if field in fields]
+        if not columns:
+            count = self.connection.execute('SELECT COUNT(*) FROM events WHERE issue_id = ?', (issue_id,)).fetchone()[0]
+            return [Event(None) for _ in range(count)]
+        events = []
+        for row in self.query(f'SELECT {", ".join(columns)} FROM events WHERE issue_id = ? ORDER BY id', (issue_id,)):
+            event = Event(None)
+            for column, value in zip(columns, row):
+                setattr(event, column, sidecar.from_epoch(value) if column == 'event_date' else value)
+            events.append(event)
+        return events
+
+
+def write(data_path:str, issues:List[Issue], source:Dict[str, any]=None) -> bool:
+    """
+    Writes the database of a data file, in bulk before the indexes
+    are created.
+    """
+    path = database_path(data_path)
+    tmp_path = sidecar.temporary_path(path)
+    try:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        connection = sqlite3.connect(tmp_path)
+        try:
+            # The file is only moved into place once it is complete, so there is nothing to journal
+            connection.execute('PRAGMA journal_mode = OFF')
+            connection.execute('PRAGMA synchronous = OFF')
+            connection.executescript(_SCHEMA)
+            with connection:
+                connection.executemany('INSERT INTO meta VALUES (?, ?)', [
+                    ('version', str(FORMAT_VERSION)),
+                    ('source', json.dumps(source or snapshot.fingerprint(data_path)))])
+                for position, issue in enumerate(issues):
+                    _insert(connection, position, issue)
+            connection.executescript(_INDEXES)
+        finally:
+            connection.close()
+        os.replace(tmp_path, path)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f'Could not write database {path}: {e}')
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    return True
+
+
+def _insert(connection:sqlite3.Connection, position:int, issue:Issue):
+    connection.execute('REPLACE INTO issues VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', (
+        position, issue.number, issue.url, _string(issue.creator),
+        issue.state.value if issue.state is not None else None, issue.title, issue.text,
+        sidecar.to_epoch(issue.created_date), sidecar.to_epoch(issue.updated_date), issue.timeline_url))
+    for table, values in (('labels', issue.labels), ('assignees', issue.assignees)):
+        connection.executemany(f'INSERT INTO {table} VALUES (?, ?, ?, ?)', [
+            (position, n, value if isinstance(value, str) else json.dumps(value), int(not isinstance(value, str)))
+            for n, value in enumerate(values or [])])
+    connection.executemany('INSERT INTO events (issue_id, event_type, author, event_date, label, comment) '
+                           'VALUES (?, ?, ?, ?, ?, ?)', [
+        (position, event.event_type, _string(event.author), sidecar.to_epoch(event.event_date),
+         event.label, event.comment)
+        for event in issue.build_events()])
+
+
+def _filter_sql(issue_filter:Optional[IssueFilter]) -> Tuple[str, List[any]]:
+    # WHERE clause over the issues table for a filter
+    if issue_filter is None or issue_filter.selects_all:
+        return '', []
+    conditions, params = [], []
+    if issue_filter.has_time_range:
+        conditions.append('created_date IS NOT NULL')
+        if issue_filter.created_after is not None:
+            conditions.append('created_date >= ?')
+            params.append(math.ceil(issue_filter.created_after))
+        if issue_filter.created_before is not None:
+            conditions.append('created_date < ?')
+            params.append(math.ceil(issue_filter.created_before))
+    if issue_filter.states is not None:
+        states = sorted(issue_filter.states)
+        conditions.append(f'state IN ({", ".join("?" * len(states))})')
+        params.extend(states)
+    return ' WHERE ' + ' AND '.join(conditions), params
+
+
+def _string(value:any) -> Optional[str]:
+    # Users are mostly strings but can also be GitHub user objects
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value)
@@ -0,0 +1,96 @@
+"""
+Symbol tables for the small vocabularies that repeat throughout the
+data (event types, users and labels). Every distinct string is stored
+once and gets a small integer code, so the loaded issues share their
+strings and analyses can compare or group by code instead of by string.
+
+The tables are shared by all datasets loaded in the process, so codes
+are comparable across datasets. They are not stable across processes.
+"""
+
+import sys
+from typing import Dict, List, Optional
+
+# Code used for missing values
+NO_CODE:int = -1
+
+
+class SymbolTable:
+    """
+    Bidirectional mapping between strings and integer codes.
+    """
+    
+    def __init__(self, kind:str):
+        self.kind:str = kind
+        self._codes:Dict[str, int] = {}
+        self._names:List[str] = []
+        self._lower:Dict[str, str] = {}
+    
+    def intern(self, value:Optional[str]) -> Optional[str]:
+        """
+        Returns the shared instance of a string, adding it to the table
+        if it is new. None is passed through.
+        """
+        if value is None:
+            return None
+        return self._names[self.code(value)]
+    
+    def code(self, value:Optional[str]) -> int:
+        """
+        Code of a string, adding it to the table if it is new.
+        """
+        if value is None:
+            return NO_CODE
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self._names)
+            self._codes[value] = code
+            self._names.append(value)
+        return code
+    
+    def lookup(self, value:Optional[str]) -> int:
+        """
+        Code of a string without adding it to the table (NO_CODE if unknown).
+        """
+        if value is None:
+            return NO_CODE
+        return self._codes.get(value, NO_CODE)
+    
+    def name(self, code:int) -> Optional[str]:
+        """
+        String for a code (None for NO_CODE).
+        """
+        if code == NO_CODE:
+            return None
+        return self._names[code]
+    
+    def lower(self, value:Optional[str]) -> Optional[str]:
+        """
+        Lowercased version of a string, computed once per distinct string.
+        """
+        if value is None:
+            return None
+        lowered = self._lower.get(value)
+        if lowered is None:
+            lowered = self._lower[value] = sys.intern(value.lower())
+        return lowered
+    
+    @property
+    def names(self) -> List[str]:
+        """
+        All strings in the table, indexed by their code.
+        """
+        return self._names
+    
+    def __len__(self) -> int:
+        return len(self._names)
+    
+    def __contains__(self, value:str) -> bool:
+        return value in self._codes
+
+
+EVENT_TYPES = SymbolTable('event_type')
+# Creators, event authors and assignees
+USERS = SymbolTable('user')
+# Issue labels and the labels of labeled/unlabeled events
+LABELS = SymbolTable('label')
@@ -0,0 +1,92 @@
+"""
+Small data files in the format of the issue dumps, for the tests.
+"""
+
+import json
+from typing import List
+
+
+def records(count:int, start:int=1) -> List[dict]:
+    """
+    Issue records whose titles and texts contain the characters that
+    record boundaries are searched for, and multi-byte characters.
+    """
+    titles = ['plain', 'ends with ", {"', 'a [{ in the title', 'naïve ünïcödé – ✓', '}, {"number": 1, "state": "open"}']
+    return [{
+        'url': f'https://github.com/python-poetry/poetry/issues/{number}',
+        'creator': f'user{number % 7}',
+        'labels': ['kind/bug'] if number % 2 else ['area/docs', 'status/triage'],
+        'state': 'open' if number % 3 else 'closed',
+        'assignees': [],
+        'title': titles[number % len(titles)],
+        'text': f'Text of {number} with "quotes", [{{brackets}}] and\nnew lines ✓',
+        'number': number,
+        'created_date': f'2024-{number % 12 + 1:02d}-{number % 28 + 1:02d}T10:00:00+00:00',
+        'updated_date': None,
+        'timeline_url': f'https://api.github.com/repos/python-poetry/poetry/issues/{number}/timeline',
+        'events': [{'event_type': 'commented', 'author': f'user{i}',
+                    'event_date': '2024-11-01T08:00:00+00:00', 'comment': f'{{"number": {i}}}, {{'}
+                   for i in range(number % 4)],
+    } for number in range(start, start + count)]
+
+
+def write_json(path:str, jobjs:List[dict], indent:int=None) -> str:
+    with open(path, 'w', encoding='utf-8') as fout:
+        json.dump(jobjs, fout, indent=indent, ensure_ascii=False)
+    return path
+
+
+def write_json_lines(path:str, jobjs:List[dict]) -> str:
+    with open(path, 'w', encoding='utf-8') as fout:
+        for jobj in jobjs:
+            fout.write(json.dumps(jobj, ensure_ascii=False) + '\n')
+    return path
+
+
+def summary(issue) -> tuple:
+    """
+    The fields of an issue (and its events) as a comparable tuple.
+    """
+    return (issue.number, issue.url, issue.creator, list(issue.labels), issue.state, list(issue.assignees),
+            issue.title, issue.text, issue.created_date, issue.updated_date, issue.timeline_url,
+            [(event.event_type, event.author, event.event_date, event.label, event.comment)
+             for event in issue.events])
+
+
+
+def event_columns(table) -> tuple:
+    """
+    The columns of an EventTable as comparable lists.
+    """
+    return (table.num_issues, table.issue.tolist(), table.event_type.tolist(), table.author.tolist(),
+            table.label.tolist(), table.timestamp.tolist())
+
+
+def delta_records(count:int, start:int) -> List[dict]:
+    """
+    Records of a delta export: the issues are closed and relabeled, and
+    have a new closing event next to the events they already had.
+    """
+    jobjs = records(count, start)
+    for jobj in jobjs:
+        jobj['state'] = 'closed'
+        jobj['labels'] = ['kind/bug', 'status/fixed']
+        jobj['assignees'] = ['maintainer']
+        jobj['events'].append({'event_type': 'closed', 'author': 'maintainer',
+                               'event_date': '2024-12-01T08:00:00+00:00'})
+    return jobjs
+
+
+def merged(issues:list, delta:list) -> list:
+    """
+    Summaries of issues with a delta merged in as by DataLoader.apply_delta().
+    """
+    expected = {issue.number: summary(issue) for issue in issues}
+    for issue in delta:
+        issue = summary(issue)
+        old = expected.get(issue[0])
+        if old is not None:
+            known = {event[:4] for event in old[-1]}
+            issue = issue[:-1] + (old[-1] + [event for event in issue[-1] if event[:4] not in known],)
+        expected[issue[0]] = issue
+    return list(expected.values())
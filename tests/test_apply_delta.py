@@ -0,0 +1,119 @@
+"""
+Tests of merging delta exports into loaded datasets (DataLoader.apply_delta()).
+"""
+
+import os
+import tempfile
+import unittest
+
+import data_loader
+from event_table import EventTable
+from issue_index import IssueIndex
+from label_index import LabelIndex
+from model import Issue
+from tests import sample_data
+
+
+class ApplyDeltaTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.data_path = sample_data.write_json(os.path.join(directory.name, 'issues.json'),
+                                                sample_data.records(200))
+        # Updates issues 190-200 and adds 201-209
+        self.delta_jobjs = sample_data.delta_records(20, start=190)
+        self.delta_path = sample_data.write_json(os.path.join(directory.name, 'delta.json'), self.delta_jobjs)
+        self.expected = sample_data.merged([Issue(jobj) for jobj in sample_data.records(200)],
+                                           [Issue(jobj) for jobj in self.delta_jobjs])
+        data_loader.clear_cache()
+        self.addCleanup(data_loader.clear_cache)
+
+    def loader(self, use_column_store:bool=False, use_sqlite:bool=False) -> data_loader.DataLoader:
+        loader = data_loader.DataLoader(self.data_path)
+        loader.use_column_store = use_column_store
+        loader.use_sqlite = use_sqlite
+        return loader
+
+    def summaries(self, loader:data_loader.DataLoader) -> list:
+        return [sample_data.summary(issue) for issue in loader.get_issues()]
+
+    def assert_persisted(self):
+        # As in a later run in the default mode
+        data_loader.clear_cache()
+        self.assertEqual(self.summaries(self.loader()), self.expected)
+
+    def test_merge(self):
+        loader = self.loader()
+        loader.get_issues()
+        self.assertEqual(loader.apply_delta(self.delta_path), (11, 9))
+        self.assertEqual(self.summaries(loader), self.expected)
+        self.assert_persisted()
+
+    def test_event_table(self):
+        loader = self.loader()
+        loader.get_event_table()
+        loader.apply_delta(self.delta_path)
+        self.assertEqual(sample_data.event_columns(loader.get_event_table()),
+                         sample_data.event_columns(EventTable.from_issues(loader.get_issues())))
+
+    def test_issue_index(self):
+        loader = self.loader()
+        index = loader.get_issue_index()
+        # Builds the index of event authors so that it is updated too
+        index.by_event_author('maintainer')
+        loader.apply_delta(self.delta_path)
+        self.assertIs(loader.get_issue_index(), index)
+        expected = IssueIndex(loader.get_issues())
+        numbers = lambda issues: [issue.number for issue in issues]
+        for number in range(185, 215):
+            self.assertIs(index.get(number), expected.get(number))
+            self.assertEqual(index.position(number), expected.position(number))
+        for user in ['maintainer'] + [f'user{n}' for n in range(7)]:
+            self.assertEqual(numbers(index.by_creator(user)), numbers(expected.by_creator(user)))
+            self.assertEqual(numbers(index.by_assignee(user)), numbers(expected.by_assignee(user)))
+            self.assertEqual(numbers(index.by_event_author(user)), numbers(expected.by_event_author(user)))
+        for label in ['kind/bug', 'area/docs', 'status/triage', 'status/fixed']:
+            self.assertEqual(numbers(index.by_label(label)), numbers(expected.by_label(label)))
+        for state in ['open', 'closed']:
+            self.assertEqual(numbers(index.by_state(state)), numbers(expected.by_state(state)))
+        self.assertEqual(index.creators(), expected.creators())
+        self.assertEqual(index.labels(), expected.labels())
+        self.assertEqual(len(index.by_event_author('maintainer')), 20)
+
+    def test_label_index(self):
+        loader = self.loader()
+        label_index = loader.get_label_index()
+        loader.apply_delta(self.delta_path)
+        self.assertIs(loader.get_label_index(), label_index)
+        expected = LabelIndex.from_issues(loader.get_issues())
+        self.assertEqual(label_index.size, expected.size)
+        self.assertEqual(sorted(label_index.labels()), sorted(expected.labels()))
+        self.assertEqual(label_index.counts(), expected.counts())
+        for label in expected.labels():
+            self.assertEqual(label_index.label(label), expected.label(label))
+        for family in ('kind', 'area', 'status'):
+            self.assertEqual(label_index.family(family), expected.family(family))
+        self.assertEqual(label_index.all(), expected.all())
+        # The added issues are selected by their labels
+        self.assertEqual(len(label_index.label('status/fixed')), 20)
+
+    def test_column_store(self):
+        loader = self.loader(use_column_store=True)
+        loader.get_issues()
+        loader.apply_delta(self.delta_path)
+        self.assert_persisted()
+        data_loader.clear_cache()
+        self.assertEqual(self.summaries(self.loader(use_column_store=True)), self.expected)
+
+    def test_sqlite(self):
+        loader = self.loader(use_sqlite=True)
+        loader.get_issues()
+        loader.apply_delta(self.delta_path)
+        self.assert_persisted()
+        data_loader.clear_cache()
+        self.assertEqual(self.summaries(self.loader(use_sqlite=True)), self.expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+"""
+Round-trip tests of the column store.
+"""
+
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+
+import column_store
+from column_store import ColumnStore
+from event_table import EventTable
+from issue_filter import IssueFilter
+from model import Issue, State
+from tests import sample_data
+
+
+class ColumnStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        jobjs = sample_data.records(300)
+        # Labels and assignees can also be GitHub objects
+        jobjs[3]['labels'] = [{'name': 'kind/bug', 'color': 'd73a4a'}, 'status/triage']
+        jobjs[4]['assignees'] = [{'login': 'user1', 'id': 1}, 'user2']
+        self.data_path = sample_data.write_json(os.path.join(directory.name, 'issues.json'), jobjs)
+        self.issues = [Issue(jobj) for jobj in jobjs]
+        self.assertTrue(column_store.write(self.data_path, self.issues))
+        self.store = ColumnStore.open(self.data_path)
+        self.assertIsNotNone(self.store)
+
+    def test_round_trip(self):
+        self.assertEqual([sample_data.summary(issue) for issue in self.store.issues(off_heap=False)],
+                         [sample_data.summary(issue) for issue in self.issues])
+        # Texts stay in the heap until they are accessed
+        self.assertEqual([str(issue.text) for issue in self.store.issues()], [issue.text for issue in self.issues])
+
+    def test_projection(self):
+        issues = self.store.issues(fields={'number', 'labels', 'events'}, event_fields={'author'})
+        self.assertEqual([(issue.number, issue.labels, [event.author for event in issue.events])
+                          for issue in issues],
+                         [(issue.number, issue.labels, [event.author for event in issue.events])
+                          for issue in self.issues])
+        self.assertTrue(all(issue.title is None and issue.state is None for issue in issues))
+
+    def test_filter(self):
+        after, before = datetime(2024, 3, 1, tzinfo=timezone.utc), datetime(2024, 9, 1, tzinfo=timezone.utc)
+        issue_filter = IssueFilter(after, before, State.open)
+        expected = [issue.number for issue in self.issues
+                    if issue.state == State.open and after <= issue.created_date < before]
+        self.assertTrue(expected)
+        self.assertEqual([issue.number for issue in self.store.issues(issue_filter=issue_filter)], expected)
+
+    def test_event_table(self):
+        self.assertEqual(sample_data.event_columns(self.store.event_table()),
+                         sample_data.event_columns(EventTable.from_issues(self.issues)))
+
+    def test_outdated(self):
+        sample_data.write_json(self.data_path, sample_data.records(299))
+        self.assertIsNone(ColumnStore.open(self.data_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
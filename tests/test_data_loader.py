@@ -0,0 +1,180 @@
+"""
+Tests of the data loader.
+"""
+
+import bz2
+import gzip
+import io
+import json
+import lzma
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+
+import data_loader
+from model import State
+from tests import sample_data
+
+
+class IterJsonArrayTest(unittest.TestCase):
+    """
+    Elements must be the same for every chunk size, i.e. wherever
+    the chunk boundaries fall inside the elements.
+    """
+
+    def assert_parses(self, text:str):
+        expected = json.loads(text)
+        for chunk_size in range(1, len(text) + 2):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(list(data_loader._iter_json_array(io.StringIO(text), chunk_size)), expected)
+
+    def test_numbers(self):
+        self.assert_parses('[45000000000.0]')
+        self.assert_parses('[0, -12, 3.25, 1e5, -2.5E-3, 45000000000.0, 7]')
+
+    def test_strings_and_literals(self):
+        self.assert_parses('[ "a", "es\\"caped\\\\", "\\u00e9 ünï ✓", true , false,null ]')
+
+    def test_objects(self):
+        self.assert_parses(json.dumps(sample_data.records(3), ensure_ascii=False))
+        self.assert_parses(json.dumps(sample_data.records(2), indent=2))
+
+    def test_empty(self):
+        self.assert_parses('[]')
+        self.assert_parses(' [ ] ')
+
+    def test_invalid(self):
+        for text in ['[1, 2', '[1 2]', '{"a": 1}']:
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                list(data_loader._iter_json_array(io.StringIO(text), 1))
+
+
+class ShardRangesTest(unittest.TestCase):
+    """
+    Shards must cover the file without gaps and together contain every
+    record once, however the file is split.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.jobjs = sample_data.records(40)
+        window = data_loader._BOUNDARY_WINDOW
+        # A small window makes candidates extend past it
+        data_loader._BOUNDARY_WINDOW = 64
+        self.addCleanup(setattr, data_loader, '_BOUNDARY_WINDOW', window)
+        self.addCleanup(self.directory.cleanup)
+
+    def assert_shards(self, path:str):
+        numbers = [jobj['number'] for jobj in self.jobjs]
+        for num_shards in range(1, 11):
+            with self.subTest(path=os.path.basename(path), num_shards=num_shards):
+                ranges = data_loader._shard_ranges(path, num_shards)
+                self.assertLessEqual(len(ranges), num_shards)
+                self.assertEqual(ranges[-1][1], os.path.getsize(path))
+                for (_, end), (start, _) in zip(ranges, ranges[1:]):
+                    self.assertEqual(end, start)
+                issues = [issue for byte_range in ranges for issue in data_loader._parse_shard(path, byte_range, None)]
+                self.assertEqual([issue.number for issue in issues], numbers)
+
+    def test_json_array(self):
+        self.assert_shards(sample_data.write_json(os.path.join(self.directory.name, 'issues.json'), self.jobjs))
+
+    def test_indented_json_array(self):
+        self.assert_shards(sample_data.write_json(os.path.join(self.directory.name, 'issues.json'), self.jobjs, 2))
+
+    def test_json_lines(self):
+        self.assert_shards(sample_data.write_json_lines(os.path.join(self.directory.name, 'issues.jsonl'), self.jobjs))
+
+class DataSourceTest(unittest.TestCase):
+    """
+    Data paths in the formats the loader accepts must yield the same issues.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.jobjs = sample_data.records(30)
+        data_loader.clear_cache()
+        self.addCleanup(data_loader.clear_cache)
+
+    def assert_loads(self, data_path:str):
+        numbers = [jobj['number'] for jobj in self.jobjs]
+        loader = data_loader.DataLoader(data_path)
+        self.assertEqual([issue.number for issue in loader.iter_issues()], numbers)
+        self.assertEqual([issue.number for issue in loader.get_issues()], numbers)
+
+    def test_directory_of_shards(self):
+        shards = os.path.join(self.directory, 'issues')
+        os.mkdir(shards)
+        # Shards are read in the order of their names, whatever their format
+        sample_data.write_json(os.path.join(shards, 'part-1.json'), self.jobjs[:10])
+        sample_data.write_json_lines(os.path.join(shards, 'part-2.jsonl'), self.jobjs[10:25])
+        sample_data.write_json(os.path.join(shards, 'part-3.json'), self.jobjs[25:])
+        with open(os.path.join(shards, 'README.txt'), 'w') as fout:
+            fout.write('Not a data file')
+        self.assert_loads(shards)
+
+    def test_compressed(self):
+        for compression, compressor in (('.gz', gzip.open), ('.bz2', bz2.open), ('.xz', lzma.open)):
+            for suffix, write in (('.json', sample_data.write_json), ('.jsonl', sample_data.write_json_lines)):
+                with self.subTest(compression=compression, suffix=suffix):
+                    plain = write(os.path.join(self.directory, f'issues{suffix}'), self.jobjs)
+                    path = plain + compression
+                    with open(plain, 'rb') as fin, compressor(path, 'wb') as fout:
+                        fout.write(fin.read())
+                    # Compressed files cannot be split into shards
+                    self.assertEqual(data_loader._shard_ranges(path, 4), [(0, os.path.getsize(path))])
+                    self.assert_loads(path)
+                    loader = data_loader.DataLoader(path)
+                    loader.use_snapshot = False
+                    loader.workers = 2
+                    data_loader.clear_cache()
+                    self.assertEqual([issue.number for issue in loader.get_issues()],
+                                     [jobj['number'] for jobj in self.jobjs])
+
+class FilteredGetIssuesTest(unittest.TestCase):
+    """
+    Filtered loads must return the same issues whether they are read from
+    the data file, the snapshot or the cached issues (or projections).
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.jobjs = sample_data.records(300)
+        self.data_path = sample_data.write_json(os.path.join(directory.name, 'issues.json'), self.jobjs)
+        data_loader.clear_cache()
+        self.addCleanup(data_loader.clear_cache)
+        self.after = datetime(2024, 3, 1, tzinfo=timezone.utc)
+        self.before = datetime(2024, 9, 1, tzinfo=timezone.utc)
+        self.expected = [jobj['number'] for jobj in self.jobjs if jobj['state'] == 'closed'
+                         and self.after.isoformat() <= jobj['created_date'] < self.before.isoformat()]
+        self.assertTrue(self.expected)
+
+    def get_numbers(self, loader:data_loader.DataLoader, **kwargs) -> list:
+        issues = loader.get_issues(created_after=self.after, created_before=self.before, state=State.closed,
+                                   **kwargs)
+        return [issue.number for issue in issues]
+
+    def test_sources(self):
+        loader = data_loader.DataLoader(self.data_path)
+        # Parsed from the data file, which also writes the snapshot
+        self.assertEqual(self.get_numbers(loader), self.expected)
+        loader.get_issues()
+        self.assertEqual(self.get_numbers(loader), self.expected)
+        data_loader.clear_cache()
+        self.assertEqual(self.get_numbers(loader), self.expected)
+
+    def test_cached_projection(self):
+        loader = data_loader.DataLoader(self.data_path)
+        loader.get_issues(fields=['number'])
+        # The cached projection has neither the creation date nor the state
+        self.assertEqual(self.get_numbers(loader, fields=['number']), self.expected)
+        loader.get_issues(fields=['number', 'state', 'created_date'])
+        self.assertEqual(self.get_numbers(loader, fields=['number', 'state', 'created_date']), self.expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+Tests of the cache of loaded datasets.
+"""
+
+import os
+import tempfile
+import unittest
+
+import data_loader
+from dataset_cache import CacheEntry, DatasetCache
+from tests import sample_data
+
+
+def entry(size:int) -> CacheEntry:
+    return CacheEntry([], size)
+
+
+class DatasetCacheTest(unittest.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = DatasetCache(budget=250)
+        a, b, c = entry(100), entry(100), entry(100)
+        cache.put(('a', 1, None, None), a)
+        cache.put(('b', 1, None, None), b)
+        # Using a makes b the least recently used entry
+        self.assertIs(cache.get(('a', 1, None, None)), a)
+        cache.put(('c', 1, None, None), c)
+        self.assertNotIn(('b', 1, None, None), cache)
+        self.assertIn(('a', 1, None, None), cache)
+        self.assertIn(('c', 1, None, None), cache)
+        self.assertEqual(cache.size, 200)
+
+    def test_keeps_entry_over_budget(self):
+        cache = DatasetCache(budget=50)
+        cache.put(('a', 1, None, None), entry(10))
+        cache.put(('b', 1, None, None), entry(100))
+        self.assertEqual(len(cache), 1)
+        self.assertIn(('b', 1, None, None), cache)
+
+    def test_replaces_outdated_entries(self):
+        cache = DatasetCache(budget=1000)
+        old, projection, new = entry(10), entry(10), entry(10)
+        cache.put(('a', 1, None, None), old)
+        cache.put(('a', 1, ('number',), None), projection)
+        self.assertIsNone(cache.outdated(('a', 1, None, None)))
+        self.assertIs(cache.outdated(('a', 2, None, None)), old)
+        cache.put(('a', 2, None, None), new)
+        self.assertEqual(len(cache), 1)
+        self.assertEqual((cache.stats['a'].loads, cache.stats['a'].reloads), (3, 1))
+
+    def test_invalidate(self):
+        cache = DatasetCache(budget=1000)
+        for key in (('a', 1, None, None), ('a', 1, ('number',), None), ('b', 1, None, None)):
+            cache.put(key, entry(10))
+        cache.invalidate('a', keep=('a', 1, None, None))
+        self.assertEqual(len(cache), 2)
+        self.assertNotIn(('a', 1, ('number',), None), cache)
+
+
+class DataLoaderCacheTest(unittest.TestCase):
+    """
+    Datasets loaded through DataLoader share the module cache.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.paths = [sample_data.write_json(os.path.join(directory.name, f'issues-{n}.json'),
+                                             sample_data.records(50, start=1000 * n)) for n in range(3)]
+        data_loader.clear_cache()
+        self.addCleanup(data_loader.clear_cache)
+        budget = data_loader._cache().budget
+        self.addCleanup(setattr, data_loader._cache(), 'budget', budget)
+
+    def test_datasets_side_by_side(self):
+        loaders = [data_loader.DataLoader(path) for path in self.paths]
+        first = [loader.get_issues() for loader in loaders]
+        for loader, issues in zip(loaders, first):
+            self.assertIs(loader.get_issues(), issues)
+        self.assertEqual([loader.get_load_stats().loads for loader in loaders], [1, 1, 1])
+
+    def test_eviction(self):
+        loaders = [data_loader.DataLoader(path) for path in self.paths]
+        issues = loaders[0].get_issues()
+        # Room for about two of the datasets
+        data_loader._cache().budget = data_loader._cache().size * 5 // 2
+        loaders[1].get_issues()
+        self.assertIs(loaders[0].get_issues(), issues)
+        loaders[2].get_issues()
+        self.assertEqual(len(data_loader._cache()), 2)
+        # The least recently used dataset was evicted and is loaded again
+        loaders[1].get_issues()
+        self.assertEqual(loaders[1].get_load_stats().loads, 2)
+
+class HotReloadTest(unittest.TestCase):
+    """
+    A data file (or directory) that changes is reloaded on the next access.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        data_loader.clear_cache()
+        self.addCleanup(data_loader.clear_cache)
+
+    def test_changed_file(self):
+        path = sample_data.write_json(os.path.join(self.directory, 'issues.json'), sample_data.records(50))
+        loader = data_loader.DataLoader(path)
+        issues = loader.get_issues()
+        self.assertIs(loader.get_issues(), issues)
+        sample_data.write_json(path, sample_data.records(60))
+        self.assertEqual([issue.number for issue in loader.get_issues()], list(range(1, 61)))
+        # The snapshot of the old data is not used
+        self.assertEqual(len(data_loader.DataLoader(path).get_issues()), 60)
+        stats = loader.get_load_stats()
+        self.assertEqual((stats.loads, stats.reloads, stats.merges), (2, 1, 0))
+        self.assertEqual(len(data_loader._cache()), 1)
+
+    def test_added_shard(self):
+        shards = os.path.join(self.directory, 'issues')
+        os.mkdir(shards)
+        sample_data.write_json(os.path.join(shards, 'part-1.json'), sample_data.records(50))
+        loader = data_loader.DataLoader(shards)
+        issues = loader.get_issues()
+        sample_data.write_json_lines(os.path.join(shards, 'part-2.jsonl'), sample_data.records(10, start=51))
+        reloaded = loader.get_issues()
+        self.assertEqual([issue.number for issue in reloaded], list(range(1, 61)))
+        # Only the added shard was parsed
+        self.assertTrue(all(old is new for old, new in zip(issues, reloaded)))
+        stats = loader.get_load_stats()
+        self.assertEqual((stats.loads, stats.reloads, stats.merges), (2, 1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
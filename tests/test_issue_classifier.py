@@ -0,0 +1,113 @@
+"""
+Tests of the issue classifier of feature 1.
+"""
+
+import itertools
+import json
+import os
+import re
+import unittest
+from typing import List
+
+from issue_classifier import OTHER, IssueClassifier
+from label_index import label_names
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'poetry_issues.json')
+
+
+def classify_type(labels:List[str], title:str='') -> str:
+    """
+    MostActiveCategoriesAnalyser._classify_type() before it was replaced
+    by IssueClassifier, which must return the same categories.
+    """
+    ll = [str(l).lower() for l in (labels or [])]
+    labset = set(ll)
+    t = (title or "").lower()
+
+    def has_any(substrs: List[str]) -> bool:
+        if not labset:
+            return False
+        return any(any(s in lab for s in substrs) for lab in labset)
+
+    def family_starts(prefix: str) -> bool:
+        p = prefix.lower()
+        if not labset:
+            return False
+        return any(lab.startswith(p + "/") or lab == p for lab in labset)
+
+    if (
+        has_any(["kind/bug", "bug", "crash", "regression", "panic", "traceback", "segfault", "needs-reproduction"])
+        or re.search(r"\bbug|crash|regression|error|fix(es)?\b", t)
+    ):
+        return "Bug"
+    if (
+        has_any(["dependency", "dependencies", "deps", "dependabot", "bump", "chore(deps)", "security(deps)"])
+        or re.search(r"\bdependenc(y|ies)|deps|dependabot|bump|poetry\.lock\b", t)
+    ):
+        return "Dependency"
+    if (
+        has_any(["ci", "cd", "workflow", "github actions", "pipeline", "build", "release", "refactor", "tooling",
+                 "flake8", "ruff"])
+        or family_starts("area/ci")
+        or family_starts("area/cli")
+        or family_starts("area/core")
+        or family_starts("area/config")
+        or family_starts("area/installer")
+        or family_starts("area/solver")
+        or has_any(["test", "tests", "pytest", "unittest"])
+        or re.search(r"\bci|cd|workflow|build|release|pipeline|test(s)?\b", t)
+    ):
+        return "Infra"
+    if (
+        has_any(["kind/feature", "kind/enhancement", "feature", "enhancement", "improvement"])
+        or re.search(r"\b(feature|enhancement|improvement|proposal|request)\b", t)
+    ):
+        return "Feature"
+    if (
+        has_any(["docs", "documentation", "readme", "guide", "tutorial", "howto", "how-to", "faq", "kind/question"])
+        or family_starts("area/docs")
+        or family_starts("docs/faq")
+        or re.search(r"\bdoc(s)?|readme|guide|tutorial|how[- ]?to|faq\b", t)
+    ):
+        return "Docs"
+    return "Other"
+
+
+class IssueClassifierTest(unittest.TestCase):
+
+    LABELS = ['kind/bug', 'kind/feature', 'kind/question', 'area/docs', 'area/docs/faq', 'area/cli', 'area/solver',
+              'area/sources', 'status/triage', 'status/duplicate', 'Dependencies', 'CI/CD', 'good first issue',
+              'Test-Suite', 'docs/faq', 'area/coreutils']
+    TITLES = ['', 'Crash when installing', 'Bump requests', 'Update poetry.lock', 'CI is slow', 'Add tests',
+              'Feature request: plugins', 'Docs: fix typo', 'How-to use groups?', 'Errors in README',
+              'Decide on the CLI', 'proposal for a new resolver', 'Nothing to see', 'Rebuild the index',
+              'Fixes #123', 'Request timeout', 'TEST FAILURE']
+
+    def test_label_and_title_combinations(self):
+        classifier = IssueClassifier()
+        label_sets = [[]] + [[label] for label in self.LABELS] + \
+            [list(pair) for pair in itertools.combinations(self.LABELS, 2)]
+        for labels, title in itertools.product(label_sets, self.TITLES):
+            with self.subTest(labels=labels, title=title):
+                self.assertEqual(classifier.classify(labels, title), classify_type(labels, title))
+
+    @unittest.skipUnless(os.path.isfile(DATA_PATH), 'the Poetry issue dump is not available')
+    def test_poetry_issues(self):
+        with open(DATA_PATH, 'r', encoding='utf-8') as fin:
+            jobjs = json.load(fin)
+        labels = [label_names(jobj.get('labels')) for jobj in jobjs]
+        titles = [jobj.get('title') for jobj in jobjs]
+        self.assertEqual(IssueClassifier().classify_many(labels, titles),
+                         [classify_type(issue_labels, title) for issue_labels, title in zip(labels, titles)])
+
+    def test_cache(self):
+        classifier = IssueClassifier(max_cache_size=4)
+        for n in range(10):
+            self.assertEqual(classifier.classify(['status/triage'], f'Issue {n}'), OTHER)
+        self.assertLessEqual(len(classifier._cache), 4)
+        self.assertEqual(classifier.classify(None, None), OTHER)
+        self.assertEqual(classifier.classify(('kind/bug',), 'Feature request'), 'Bug')
+
+
+if __name__ == '__main__':
+    unittest.main()
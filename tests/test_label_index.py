@@ -0,0 +1,33 @@
+"""
+Tests of the bitmap label index.
+"""
+
+import unittest
+
+from issue_index import IssueIndex
+from label_index import LabelIndex, label_names
+from model import Issue
+
+
+class LabelNamesTest(unittest.TestCase):
+
+    def setUp(self):
+        labels = [['kind/bug', 'area/docs'], [{'name': 'kind/bug', 'color': 'd73a4a'}], [{'color': 'ededed'}],
+                  [None, 7, 'status/triage'], []]
+        self.issues = [Issue({'number': number, 'state': 'open', 'labels': issue_labels})
+                       for number, issue_labels in enumerate(labels, 1)]
+
+    def test_label_names(self):
+        self.assertEqual([label_names(issue.labels) for issue in self.issues],
+                         [['kind/bug', 'area/docs'], ['kind/bug'], [], ['status/triage'], []])
+
+    def test_indexes_agree(self):
+        # Label objects and other values are read the same way by both indexes
+        issue_index, label_index = IssueIndex(self.issues), LabelIndex.from_issues(self.issues)
+        self.assertEqual(issue_index.labels(), label_index.counts())
+        for label in label_index.labels():
+            self.assertEqual(issue_index.by_label(label), label_index.label(label).select(self.issues))
+
+
+if __name__ == '__main__':
+    unittest.main()
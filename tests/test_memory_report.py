@@ -0,0 +1,52 @@
+"""
+Tests of the memory accounting of loaded issues.
+"""
+
+import unittest
+
+import data_loader
+import memory_report
+from model import Issue
+from tests import sample_data
+from text_heap import TextHeap
+
+
+class MeasureTest(unittest.TestCase):
+
+    def setUp(self):
+        self.jobjs = sample_data.records(50)
+        self.text_bytes = sum(len(jobj[field].encode('utf-8')) for jobj in self.jobjs for field in ('title', 'text'))
+        self.text_bytes += sum(len(event['comment'].encode('utf-8')) for jobj in self.jobjs
+                               for event in jobj['events'])
+
+    def issues(self, heap:TextHeap=None) -> list:
+        issues = list(data_loader._build_issues(sample_data.records(50), heap, None, None, None))
+        for issue in issues:
+            issue.events
+        return issues
+
+    def test_texts_on_heap(self):
+        sizes = memory_report.measure(self.issues())
+        self.assertGreater(sizes['texts'], self.text_bytes)
+        self.assertEqual(sizes['text handles'], 0)
+        self.assertEqual(sizes['texts (mapped)'], 0)
+        # Texts are not counted as strings
+        strings = memory_report.measure([Issue({'number': 1, 'state': 'open', 'title': 'x' * 10000})])
+        self.assertLess(strings['strings'], 10000)
+
+    def test_texts_in_mapped_heap(self):
+        sizes = memory_report.measure(self.issues(TextHeap()))
+        self.assertEqual(sizes['texts'], 0)
+        self.assertGreater(sizes['text handles'], 0)
+        self.assertEqual(sizes['texts (mapped)'], self.text_bytes)
+
+    def test_total(self):
+        sizes = memory_report.measure(self.issues(TextHeap()), {'event table': 1000})
+        self.assertEqual(sizes['event table'], 1000)
+        # Mapped texts are not part of the total
+        self.assertEqual(sizes['total'], sum(size for category, size in sizes.items()
+                                             if category not in ('total', 'texts (mapped)')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+Tests of the runtime data model.
+"""
+
+import unittest
+from datetime import datetime, timedelta, timezone
+
+import model
+from model import Event, Issue
+from symbols import NO_CODE, USERS
+
+
+class ParseTimestampTest(unittest.TestCase):
+
+    def test_dump_format(self):
+        self.assertEqual(model.parse_timestamp('2024-10-20T00:33:06+00:00'),
+                         datetime(2024, 10, 20, 0, 33, 6, tzinfo=timezone.utc))
+
+    def test_other_formats(self):
+        self.assertEqual(model.parse_timestamp('2024-10-20T02:33:06+02:00'),
+                         datetime(2024, 10, 20, 2, 33, 6, tzinfo=timezone(timedelta(hours=2))))
+        self.assertEqual(model.parse_timestamp('2024-10-20'), datetime(2024, 10, 20))
+
+    def test_missing_or_unparseable(self):
+        for value in [None, '', 'not a date', '2024-13-45T00:00:00+00:00', 12, ['2024'], {'date': '2024'}]:
+            with self.subTest(value=value):
+                self.assertIsNone(model.parse_timestamp(value))
+
+    def test_issue_and_event_dates(self):
+        issue = Issue({'number': 1, 'state': 'open', 'created_date': ['2024'], 'updated_date': 'never',
+                       'events': [{'event_type': 'closed', 'event_date': {'date': '2024'}}]})
+        self.assertIsNone(issue.created_date)
+        self.assertIsNone(issue.updated_date)
+        self.assertIsNone(issue.events[0].event_date)
+
+class SymbolTest(unittest.TestCase):
+
+    def test_interned(self):
+        issue = Issue({'number': 1, 'state': 'open', 'creator': ''.join(['user', '1']), 'labels': ['kind/bug'],
+                       'events': [{'event_type': 'labeled', 'author': ''.join(['user', '1']), 'label': 'kind/bug'}]})
+        event = issue.events[0]
+        self.assertIs(issue.creator, event.author)
+        self.assertEqual(issue.creator_code, event.author_code)
+        self.assertEqual(USERS.name(issue.creator_code), 'user1')
+        self.assertIs(event.label, issue.labels[0])
+
+    def test_user_objects(self):
+        # Users can also be GitHub user objects, which are kept as they are
+        creator, author = {'login': 'user1', 'id': 1}, {'login': 'user2', 'id': 2}
+        issue = Issue({'number': 1, 'state': 'open', 'creator': creator, 'assignees': [creator],
+                       'labels': [{'name': 'kind/bug'}],
+                       'events': [{'event_type': 'labeled', 'author': author, 'label': {'name': 'kind/bug'}}]})
+        event = issue.events[0]
+        self.assertEqual(issue.creator, creator)
+        self.assertEqual(issue.creator_code, NO_CODE)
+        self.assertEqual(issue.assignee_codes, [NO_CODE])
+        self.assertEqual(issue.label_codes, [NO_CODE])
+        self.assertEqual(event.author, author)
+        self.assertEqual(event.author_code, NO_CODE)
+        self.assertEqual(event.label, {'name': 'kind/bug'})
+        self.assertEqual(event.label_code, NO_CODE)
+        self.assertEqual(event.event_type, 'labeled')
+
+    def test_missing(self):
+        event = Event({})
+        self.assertIsNone(event.author)
+        self.assertEqual(event.author_code, NO_CODE)
+
+
+if __name__ == '__main__':
+    unittest.main()
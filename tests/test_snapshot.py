@@ -0,0 +1,102 @@
+"""
+Round-trip tests of the snapshot and the delta segments appended to it.
+"""
+
+import os
+import tempfile
+import unittest
+from datetime import datetime, timezone
+
+import snapshot
+from issue_filter import IssueFilter
+from model import Issue, State
+from tests import sample_data
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.data_path = sample_data.write_json(os.path.join(self.directory, 'issues.json'), sample_data.records(600))
+        self.issues = [Issue(jobj) for jobj in sample_data.records(600)]
+        # Updates issues 590-600 (with new and already known events) and adds 601-609
+        self.delta_jobjs = sample_data.delta_records(20, start=590)
+        self.delta_path = sample_data.write_json(os.path.join(self.directory, 'delta.json'), self.delta_jobjs)
+
+    def load(self, **kwargs):
+        issues = snapshot.load(self.data_path, off_heap=False, **kwargs)
+        self.assertIsNotNone(issues)
+        return [sample_data.summary(issue) for issue in issues]
+
+    def append_delta(self) -> bool:
+        return snapshot.append_delta(self.data_path, [Issue(jobj) for jobj in self.delta_jobjs],
+                                     snapshot.fingerprint(self.delta_path))
+
+    def expected_merge(self) -> list:
+        return sample_data.merged(self.issues, [Issue(jobj) for jobj in self.delta_jobjs])
+
+    def test_round_trip(self):
+        self.assertTrue(snapshot.save(self.data_path, self.issues))
+        self.assertEqual(self.load(), [sample_data.summary(issue) for issue in self.issues])
+
+    def test_projection(self):
+        self.assertTrue(snapshot.save(self.data_path, self.issues))
+        issues = snapshot.load(self.data_path, off_heap=False, fields={'number', 'title'})
+        self.assertEqual([(issue.number, issue.title) for issue in issues],
+                         [(issue.number, issue.title) for issue in self.issues])
+
+    def test_filtered_load(self):
+        self.assertTrue(snapshot.save(self.data_path, self.issues))
+        after, before = datetime(2024, 3, 1, tzinfo=timezone.utc), datetime(2024, 9, 1, tzinfo=timezone.utc)
+        for issue_filter in (IssueFilter(after, before, State.closed), IssueFilter(after, None, None),
+                             IssueFilter(None, before, State.open), IssueFilter(None, None, State.closed)):
+            with self.subTest(issue_filter=vars(issue_filter)):
+                expected = [sample_data.summary(issue) for issue in self.issues
+                            if issue_filter.matches(issue.created_date.timestamp(), issue.state.value)]
+                self.assertTrue(expected)
+                self.assertEqual(self.load(issue_filter=issue_filter), expected)
+
+    def test_outdated(self):
+        self.assertTrue(snapshot.save(self.data_path, self.issues))
+        sample_data.write_json(self.data_path, sample_data.records(599))
+        self.assertIsNone(snapshot.load(self.data_path))
+        self.assertFalse(self.append_delta())
+
+    def test_delta(self):
+        self.assertTrue(snapshot.save(self.data_path, self.issues))
+        self.assertTrue(self.append_delta())
+        self.assertEqual(self.load(), self.expected_merge())
+
+    def test_delta_appended_once(self):
+        self.assertTrue(snapshot.save(self.data_path, self.issues))
+        self.assertTrue(self.append_delta())
+        size = os.path.getsize(snapshot.snapshot_path(self.data_path))
+        self.assertTrue(self.append_delta())
+        self.assertEqual(os.path.getsize(snapshot.snapshot_path(self.data_path)), size)
+        self.assertEqual(self.load(), self.expected_merge())
+
+    def test_incomplete_delta(self):
+        self.assertTrue(snapshot.save(self.data_path, self.issues))
+        path = snapshot.snapshot_path(self.data_path)
+        size = os.path.getsize(path)
+        self.assertTrue(self.append_delta())
+        # As if the process appending the delta was interrupted
+        with open(path, 'r+b') as fout:
+            fout.truncate((size + os.path.getsize(path)) // 2)
+        self.assertEqual(self.load(), [sample_data.summary(issue) for issue in self.issues])
+        # The incomplete segment is replaced when the delta is appended again
+        self.assertTrue(self.append_delta())
+        self.assertEqual(self.load(), self.expected_merge())
+
+    def test_filtered_delta(self):
+        self.assertTrue(snapshot.save(self.data_path, self.issues))
+        self.assertTrue(self.append_delta())
+        after = datetime(2024, 3, 1, tzinfo=timezone.utc)
+        expected = [issue for issue in self.expected_merge() if issue[4] == State.closed and after <= issue[8]]
+        self.assertEqual(self.load(issue_filter=IssueFilter(after, None, State.closed)), expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
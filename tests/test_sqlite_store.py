@@ -0,0 +1,78 @@
+"""
+Round-trip tests of the SQLite database.
+"""
+
+import os
+import tempfile
+import unittest
+from collections import Counter
+from datetime import datetime, timezone
+
+import sqlite_store
+from issue_filter import IssueFilter
+from model import Issue, State
+from sqlite_store import SqliteStore
+from tests import sample_data
+
+
+class SqliteStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        jobjs = sample_data.records(300)
+        # Labels and assignees can also be GitHub objects
+        jobjs[3]['labels'] = [{'name': 'kind/bug', 'color': 'd73a4a'}, 'status/triage']
+        jobjs[4]['assignees'] = [{'login': 'user1', 'id': 1}, 'user2']
+        self.data_path = sample_data.write_json(os.path.join(directory.name, 'issues.json'), jobjs)
+        self.issues = [Issue(jobj) for jobj in jobjs]
+        self.assertTrue(sqlite_store.write(self.data_path, self.issues))
+        self.store = SqliteStore.open(self.data_path)
+        self.assertIsNotNone(self.store)
+        self.addCleanup(self.store.close)
+
+    def test_round_trip(self):
+        self.assertEqual(self.store.num_issues(), len(self.issues))
+        self.assertEqual([sample_data.summary(issue) for issue in self.store.issues()],
+                         [sample_data.summary(issue) for issue in self.issues])
+
+    def test_projection(self):
+        issues = self.store.issues(fields={'number', 'labels', 'events'}, event_fields={'author'})
+        self.assertEqual([(issue.number, issue.labels, [event.author for event in issue.events])
+                          for issue in issues],
+                         [(issue.number, issue.labels, [event.author for event in issue.events])
+                          for issue in self.issues])
+        self.assertTrue(all(issue.title is None and issue.state is None for issue in issues))
+
+    def test_filter(self):
+        after, before = datetime(2024, 3, 1, tzinfo=timezone.utc), datetime(2024, 9, 1, tzinfo=timezone.utc)
+        issue_filter = IssueFilter(after, before, State.open)
+        expected = [sample_data.summary(issue) for issue in self.issues
+                    if issue.state == State.open and after <= issue.created_date < before]
+        self.assertTrue(expected)
+        self.assertEqual([sample_data.summary(issue) for issue in self.store.issues(issue_filter=issue_filter)],
+                         expected)
+
+    def test_event_counts(self):
+        events = [event for issue in self.issues for event in issue.events]
+        self.assertEqual(self.store.event_counts('author'), Counter(event.author for event in events))
+        self.assertEqual(self.store.event_counts('event_type', datetime(2024, 1, 1, tzinfo=timezone.utc),
+                                                       datetime(2025, 1, 1, tzinfo=timezone.utc)),
+                         Counter(event.event_type for event in events if event.event_date.year == 2024))
+        self.assertEqual(self.store.event_counts('author', event_type='closed'), {})
+
+    def test_upsert(self):
+        issue = Issue(sample_data.delta_records(1, start=10)[0])
+        self.store.upsert([(9, issue)])
+        issues = self.store.issues()
+        self.assertEqual(sample_data.summary(issues[9]), sample_data.summary(issue))
+        self.assertEqual([sample_data.summary(issue) for issue in issues[:9] + issues[10:]],
+                         [sample_data.summary(issue) for issue in self.issues[:9] + self.issues[10:]])
+
+    def test_outdated(self):
+        sample_data.write_json(self.data_path, sample_data.records(299))
+        self.assertIsNone(SqliteStore.open(self.data_path))
+
+
+if __name__ == '__main__':
+    unittest.main()
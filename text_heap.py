@@ -0,0 +1,139 @@
+"""
+Off-heap storage for the long text fields of the issues (titles, bodies
+and comments). The text is kept UTF-8 encoded in a memory-mapped file and
+the issues only hold small handles that decode the text when accessed, so
+the prose in the data file does not stay resident in the Python heap.
+"""
+
+import mmap
+import tempfile
+from typing import BinaryIO, Optional
+
+
+class TextRef:
+    """
+    Handle to a string stored in a TextHeap.
+    """
+    
+    __slots__ = ('heap', 'offset', 'length')
+    
+    def __init__(self, heap:'TextHeap', offset:int, length:int):
+        self.heap:TextHeap = heap
+        self.offset:int = offset
+        self.length:int = length
+    
+    def raw(self) -> bytes:
+        """
+        UTF-8 encoded bytes of the string.
+        """
+        return self.heap.read(self.offset, self.length)
+    
+    def decode(self) -> str:
+        return self.raw().decode('utf-8')
+    
+    def __str__(self) -> str:
+        return self.decode()
+    
+    def __repr__(self) -> str:
+        return f'TextRef(offset={self.offset}, length={self.length})'
+
+
+class TextHeap:
+    """
+    Append-only, memory-mapped blob of UTF-8 encoded strings. A heap is
+    either a writable scratch heap backed by an anonymous temporary file,
+    or a read-only view of a region of an existing file (see open()).
+    """
+    
+    def __init__(self, fileobj:Optional[BinaryIO]=None, writable:bool=True):
+        """
+        Constructor. Without a file object the heap is backed by a
+        temporary file that is deleted when the heap is garbage collected.
+        """
+        self._file:BinaryIO = fileobj if fileobj is not None else tempfile.TemporaryFile()
+        self._writable:bool = writable
+        self._size:int = self._file.seek(0, 2)
+        self._map:Optional[mmap.mmap] = None
+        self._mapped_size:int = 0
+    
+    @classmethod
+    def create(cls, path:str) -> 'TextHeap':
+        """
+        Creates a writable heap backed by a named file. Unlike heaps
+        backed by anonymous temporary files, it can be pickled (e.g. to
+        hand it from a worker process to the parent), in which case it
+        is reopened read-only from the file.
+        """
+        return cls(open(path, 'w+b'))
+    
+    @classmethod
+    def open(cls, path:str) -> 'TextHeap':
+        """
+        Opens a file read-only as a heap. The offsets of the handles
+        created with ref() are absolute offsets into the file.
+        """
+        return cls(open(path, 'rb'), writable=False)
+    
+    def add(self, value:Optional[str]) -> Optional[TextRef]:
+        """
+        Stores a string and returns the handle to it. None is passed through.
+        """
+        if value is None:
+            return None
+        return self.add_raw(value.encode('utf-8'))
+    
+    def add_raw(self, data:bytes) -> TextRef:
+        """
+        Stores an already UTF-8 encoded string.
+        """
+        if not self._writable:
+            raise ValueError('Cannot add text to a read-only heap')
+        offset = self._size
+        self._file.seek(offset)
+        self._file.write(data)
+        self._size += len(data)
+        return TextRef(self, offset, len(data))
+    
+    def ref(self, offset:int, length:int) -> TextRef:
+        """
+        Handle to a string that is already stored in the heap.
+        """
+        return TextRef(self, offset, length)
+    
+    def read(self, offset:int, length:int) -> bytes:
+        if length == 0:
+            return b''
+        if offset + length > self._mapped_size:
+            self._remap()
+        return self._map[offset:offset + length]
+    
+    def _remap(self):
+        # The map only covers the file as it was when it was created,
+        # so it needs to be recreated after strings have been added
+        self._file.flush()
+        if self._map is not None:
+            self._map.close()
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mapped_size = len(self._map)
+    
+    def __reduce__(self):
+        if not isinstance(self._file.name, str):
+            raise TypeError('A heap backed by an anonymous temporary file cannot be pickled')
+        self._file.flush()
+        return (TextHeap.open, (self._file.name,))
+    
+    @property
+    def size(self) -> int:
+        """
+        Number of bytes stored in the heap.
+        """
+        return self._size
+
+
+def resolve(value:any) -> any:
+    """
+    Decodes a value if it is a handle to a string in a heap.
+    """
+    if isinstance(value, TextRef):
+        return value.decode()
+    return value
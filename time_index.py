@@ -0,0 +1,117 @@
+"""
+Sorted time index over the creation and update dates of the issues and
+the dates of their events, so that time range and sliding window queries
+are answered by binary search instead of scanning all issues or events.
+"""
+
+from datetime import datetime
+from typing import Callable, List, Optional, Union
+
+import numpy as np
+
+from event_table import EventTable, NO_TIMESTAMP
+from model import Issue
+
+# A bound of a time range: a datetime (naive datetimes are in local time,
+# like datetime.now()), UTC seconds since the epoch or None for no bound
+TimeBound = Union[datetime, int, float, None]
+
+
+class TimeIndex:
+    """
+    Sorted int64 arrays (UTC seconds since the epoch) of the created and
+    updated dates of the issues and of the event dates in an EventTable,
+    each with the permutation that sorts them. Issues and events without
+    a date are left out.
+    
+    The event arrays are built on the first event query, from the event
+    table returned by event_loader, so that queries over the issues do not
+    need all events.
+    """
+
+    def __init__(self, issues:List[Issue], event_loader:Callable[[], EventTable]=None):
+        self.issues:List[Issue] = issues
+        self.created, self.created_order = _sorted_dates([issue.created_date for issue in issues])
+        self.updated, self.updated_order = _sorted_dates([issue.updated_date for issue in issues])
+        self._event_loader:Optional[Callable[[], EventTable]] = event_loader
+        # Rows of the event table in the order of their timestamps, and the timestamps
+        self._event_order:Optional[np.ndarray] = None
+        self._event_times:Optional[np.ndarray] = None
+
+    def issue_positions_between(self, start:TimeBound=None, end:TimeBound=None,
+                                field:str='created_date') -> np.ndarray:
+        """
+        Positions of the issues with start <= created_date (or updated_date)
+        < end in the issue list, in the order of their dates.
+        """
+        if field == 'created_date':
+            times, order = self.created, self.created_order
+        elif field == 'updated_date':
+            times, order = self.updated, self.updated_order
+        else:
+            raise ValueError(f'No time index for {field}')
+        return order[_range(times, start, end)]
+
+    def issues_between(self, start:TimeBound=None, end:TimeBound=None,
+                       field:str='created_date') -> List[Issue]:
+        """
+        The issues with start <= created_date (or updated_date) < end, in
+        the order of the issue list.
+        """
+        positions = np.sort(self.issue_positions_between(start, end, field))
+        return [self.issues[position] for position in positions.tolist()]
+
+    def events_between(self, start:TimeBound=None, end:TimeBound=None) -> np.ndarray:
+        """
+        Rows of the event table of the events with start <= event_date < end,
+        in the order of their dates.
+        """
+        self._build_event_arrays()
+        return self._event_order[_range(self._event_times, start, end)]
+
+    def event_counts(self, starts:np.ndarray, ends:np.ndarray) -> np.ndarray:
+        """
+        Number of events in each of the windows [starts[i], ends[i]) (UTC
+        seconds), e.g. for sliding window analyses.
+        """
+        self._build_event_arrays()
+        return (np.searchsorted(self._event_times, ends, side='left')
+                - np.searchsorted(self._event_times, starts, side='left'))
+
+    def _build_event_arrays(self):
+        if self._event_order is not None:
+            return
+        if self._event_loader is None:
+            raise ValueError('The time index was built without events')
+        events = self._event_loader()
+        dated = np.flatnonzero(events.timestamp != NO_TIMESTAMP)
+        order = np.argsort(events.timestamp[dated], kind='stable')
+        self._event_order = dated[order]
+        self._event_times = np.asarray(events.timestamp[self._event_order])
+
+
+def to_timestamp(value:TimeBound) -> Optional[int]:
+    """
+    Converts a bound of a time range to UTC seconds since the epoch.
+    Fractions of a second are rounded up since the dates are whole seconds.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        value = value.timestamp()
+    return int(np.ceil(value))
+
+
+def _sorted_dates(dates:List[Optional[datetime]]):
+    positions = np.array([n for n, date in enumerate(dates) if date is not None], dtype=np.int64)
+    times = np.array([int(date.timestamp()) for date in dates if date is not None], dtype=np.int64)
+    order = np.argsort(times, kind='stable')
+    return times[order], positions[order]
+
+
+def _range(times:np.ndarray, start:TimeBound, end:TimeBound) -> slice:
+    # Slice of a sorted time array with start <= time < end
+    start, end = to_timestamp(start), to_timestamp(end)
+    first = 0 if start is None else int(np.searchsorted(times, start, side='left'))
+    last = len(times) if end is None else int(np.searchsorted(times, end, side='left'))
+    return slice(first, max(first, last))
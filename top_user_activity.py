@@ -8,6 +8,8 @@ from collections import Counter
 import config
 from data_loader import DataLoader
 from model import Issue, Event
+from sqlite_store import SqliteStore
+from symbols import EVENT_TYPES
 
 
 class TopUserActivityAnalyser:
@@ -28,7 +30,10 @@ class TopUserActivityAnalyser:
     def __init__(self) -> None:
         """Initialize configuration, data loader, and issue list."""
         config._init_config()
-        self.issues: List[Issue] = DataLoader().get_issues()
+        loader = DataLoader()
+        # With the SQLite backend the counts are computed in SQL, without loading the issues
+        self.store: SqliteStore | None = loader.open_sqlite_store() if loader.use_sqlite else None
+        self.issues: List[Issue] = loader.get_issues() if self.store is None else []
 
     def run(self,
             top_n: int = 5,
@@ -73,18 +78,23 @@ class TopUserActivityAnalyser:
         Build a DataFrame with columns:
             user | opened | closed | commented | score
         """
+        if self.store is not None:
+            opened, closed, commented = self._count_activity_sql(credit_creator_when_closed_unknown)
+            return self._activity_dataframe(opened, closed, commented)
+
         opened = Counter()
         closed = Counter()
         commented = Counter()
 
-        # 1) Opened (from issues' creators)
+        # Single pass over the issues so that an iterator (e.g.
+        # DataLoader().iter_issues()) can be used in place of a list
         for iss in self.issues:
+            # 1) Opened (from issues' creators)
             creator = self._issue_creator(iss)
             if creator:
                 opened[creator] += 1
 
-        # 2) Closed / Commented (prefer per-issue events if present)
-        for iss in self.issues:
+            # 2) Closed / Commented (prefer per-issue events if present)
             has_any_events = hasattr(iss, "events") and isinstance(iss.events, list)
 
             if has_any_events and iss.events:
@@ -99,10 +109,30 @@ class TopUserActivityAnalyser:
                         commented[actor] += 1
             else:
                 if credit_creator_when_closed_unknown and self._issue_state(iss) == "closed":
-                    creator = self._issue_creator(iss)
                     if creator:
                         closed[creator] += 1
 
+        return self._activity_dataframe(opened, closed, commented)
+
+    def _count_activity_sql(self, credit_creator_when_closed_unknown: bool) -> Tuple[Counter, Counter, Counter]:
+        """
+        Same counts as the loop in _compute_activity_dataframe, grouped in SQL.
+        """
+        opened = Counter(dict(self.store.query(
+            "SELECT creator, COUNT(*) FROM issues WHERE creator != '' GROUP BY creator")))
+        closed, commented = Counter(), Counter()
+        for actor, etype, count in self.store.query(
+                "SELECT author, lower(event_type) AS etype, COUNT(*) FROM events "
+                "WHERE author != '' AND etype IN ('closed', 'commented') GROUP BY author, etype"):
+            (closed if etype == "closed" else commented)[actor] += count
+        if credit_creator_when_closed_unknown:
+            closed.update(dict(self.store.query(
+                "SELECT creator, COUNT(*) FROM issues WHERE creator != '' AND lower(state) = 'closed' "
+                "AND NOT EXISTS (SELECT 1 FROM events WHERE events.issue_id = issues.id) GROUP BY creator")))
+        return opened, closed, commented
+
+    @staticmethod
+    def _activity_dataframe(opened: Counter, closed: Counter, commented: Counter) -> pd.DataFrame:
         # 3) Merge into a DataFrame
         contributors = set(opened) | set(closed) | set(commented)
         rows: List[Dict[str, int | str]] = []
@@ -211,7 +241,8 @@ class TopUserActivityAnalyser:
               or getattr(ev, "event", None))
         if not et and isinstance(ev, dict):
             et = ev.get("event_type") or ev.get("type") or ev.get("event")
-        return (et or "").lower()
+        # Lowercased once per distinct event type instead of once per event
+        return EVENT_TYPES.lower(et) if isinstance(et, str) else ""
 
     @staticmethod
     def _event_actor(ev: Event) -> str | None: